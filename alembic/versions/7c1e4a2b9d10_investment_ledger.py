@@ -0,0 +1,37 @@
+"""investment ledger
+
+Revision ID: 7c1e4a2b9d10
+Revises: 255130c9f896
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1e4a2b9d10'
+down_revision = '255130c9f896'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('investment',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('donation_id', sa.Integer(), nullable=True),
+    sa.Column('project_id', sa.Integer(), nullable=True),
+    sa.Column('amount', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['donation_id'], ['donation.id'], ),
+    sa.ForeignKeyConstraint(['project_id'], ['charityproject.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_investment_donation_id'), 'investment', ['donation_id'], unique=False)
+    op.create_index(op.f('ix_investment_project_id'), 'investment', ['project_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_investment_project_id'), table_name='investment')
+    op.drop_index(op.f('ix_investment_donation_id'), table_name='investment')
+    op.drop_table('investment')
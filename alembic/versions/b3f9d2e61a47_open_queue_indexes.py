@@ -0,0 +1,33 @@
+"""open queue indexes
+
+Revision ID: b3f9d2e61a47
+Revises: 7c1e4a2b9d10
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f9d2e61a47'
+down_revision = '7c1e4a2b9d10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('charityproject', 'donation'):
+        op.create_index(
+            f'ix_{table}_open_fifo', table, ['create_date', 'id'],
+            unique=False,
+            sqlite_where=sa.text('fully_invested = 0'),
+            postgresql_where=sa.text('NOT fully_invested'),
+        )
+    op.create_index(op.f('ix_donation_user_id'), 'donation', ['user_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_donation_user_id'), table_name='donation')
+    for table in ('donation', 'charityproject'):
+        op.drop_index(f'ix_{table}_open_fifo', table_name=table)
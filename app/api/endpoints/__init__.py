@@ -1,3 +1,5 @@
 from .charity_project import router as charity_project_router # noqa
 from .donation import router as donation_router # noqa
+from .metrics import router as metrics_router # noqa
+from .profiler import router as profiler_router # noqa
 from .user import router as user_router # noqa
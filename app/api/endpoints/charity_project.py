@@ -1,14 +1,29 @@
-from fastapi import APIRouter, Depends
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.pagination import Page, sparse_fields
 from app.api.validators import CharityProjectValidator
+from app.core.cache import data_version, response_cache
 from app.core.db import get_async_session
 from app.core.user import current_superuser
 from app.crud.charity_project import charity_project_crud
+from app.crud.investment import investment_crud
+from app.models import CharityProject
 from app.schemas.charity_project import (
+    AllocationSimulation, AllocationSimulationRequest,
     CharityProjectCreate, CharityProjectDB, CharityProjectUpdate
 )
-from app.services.charity_services import close, donate
+from app.schemas.investment import InvestmentDB
+from app.services.charity_services import (
+    close, create_and_donate_batch, donate
+)
+from app.services.export import (
+    MEDIA_TYPES, ExportFormat, export_rows, model_response, rows_response
+)
+from app.services.simulation import simulate
 
 router = APIRouter()
 
@@ -35,16 +50,113 @@ async def create_new_charity_project(
     return new_project
 
 
+@router.post(
+    '/bulk',
+    response_model=list[CharityProjectDB],
+    response_model_exclude_none=True,
+    dependencies=[Depends(current_superuser)]
+)
+async def create_charity_projects_bulk(
+        charity_projects: list[CharityProjectCreate],
+        session: AsyncSession = Depends(get_async_session)
+):
+    """Создать несколько проектов и распределить по ним пожертвования
+    за один проход. Только для суперпользователей"""
+    if not charity_projects:
+        return []
+    await CharityProjectValidator.check_names_duplicate(
+        [project.name for project in charity_projects], session
+    )
+    ids = await create_and_donate_batch(
+        charity_project_crud,
+        [project.dict() for project in charity_projects],
+        session,
+    )
+    return await charity_project_crud.get_by_ids(ids, session)
+
+
+@router.post(
+    '/simulate',
+    response_model=AllocationSimulation,
+    dependencies=[Depends(current_superuser)]
+)
+async def simulate_charity_project(
+        obj_in: AllocationSimulationRequest,
+        session: AsyncSession = Depends(get_async_session)
+):
+    """Показать, какие ожидающие пожертвования покроют новый проект,
+    ничего не создавая. Только для суперпользователей"""
+    return await simulate(CharityProject, obj_in.full_amount, session)
+
+
 @router.get(
     '/',
     response_model=list[CharityProjectDB],
     response_model_exclude_none=True,
 )
 async def get_all_charity_projects(
+        request: Request,
+        response: Response,
+        page: Page = Depends(),
+        fields: Optional[list[str]] = Depends(
+            sparse_fields(CharityProjectDB)
+        ),
+        session: AsyncSession = Depends(get_async_session),
+):
+    """Получить список проектов постранично,
+    с fields — только перечисленные поля.
+
+    Ответ кэшируется до следующей записи в БД; повтор с If-None-Match
+    получает 304 без обращения к БД."""
+    cached = response_cache.get(request)
+    if cached is not None:
+        return cached
+    version = data_version.value
+    projects = page.respond(
+        await charity_project_crud.get_multi(
+            session, fields=fields, **page.seek
+        ),
+        request, response,
+    )
+    if fields:
+        body = rows_response(
+            fields, projects, page.headers, CharityProject.__tablename__
+        )
+    elif response_cache.max_size:
+        body = model_response(CharityProjectDB, projects, page.headers)
+    else:
+        return projects
+    return response_cache.put(request, version, body)
+
+
+@router.get(
+    '/export',
+    response_class=StreamingResponse,
+    dependencies=[Depends(current_superuser)],
+)
+async def export_charity_projects(
+        export_format: ExportFormat = Query('ndjson', alias='format'),
+        session: AsyncSession = Depends(get_async_session),
+):
+    """Выгрузить все проекты потоком NDJSON или JSON-массива.
+    Только для суперпользователей."""
+    return StreamingResponse(
+        export_rows(CharityProject, CharityProjectDB, session, export_format),
+        media_type=MEDIA_TYPES[export_format],
+    )
+
+
+@router.get(
+    '/{project_id}/investments',
+    response_model=list[InvestmentDB],
+)
+async def get_charity_project_investments(
+        project_id: int,
         session: AsyncSession = Depends(get_async_session),
 ):
-    """Получить список всех проектов."""
-    return await charity_project_crud.get_multi(session)
+    """Получить пожертвования, из которых собран проект."""
+    await CharityProjectValidator.get_if_exists(project_id, session)
+    return await investment_crud.get_for_project(project_id, session)
 
 
 @router.patch(
@@ -1,34 +1,18 @@
-from fastapi import APIRouter, Depends
+from typing import List
 
+from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.validators import CharityProjectValidator
 from app.core.db import get_async_session
+from app.core.user import current_superuser
 from app.crud.charityproject import charityproject_crud
-from app.crud.donation import donation_crud
 from app.schemas.charityproject import (
+    CharityprojectBase,
     CharityprojectCreate,
-    CharityprojectUpdateThreeFields,
     CharityProjectResponse,
-    CharityprojectBase
 )
-from app.schemas.donation import (
-    DonationUpdate
-)
-from app.services import donation_handler
-from app.api.validators import (
-    check_name_duplicate,
-    check_charityproject_exists,
-    check_project_invested_amount,
-    check_project_fully_invested,
-    check_donation_exists,
-    check_project_unic_name
-)
-from app.core.user import current_superuser
-from typing import List
-from datetime import datetime
-from http import HTTPStatus
-
-from fastapi import HTTPException
+from app.services.charity_services import close, donate
 
 router = APIRouter()
 
@@ -56,39 +40,12 @@ async def create_new_charityproject(
     Raises:
         HTTPException: Если произошла ошибка в процессе создания проекта.
     """
-    await check_name_duplicate(charityproject.name, session)
+    await CharityProjectValidator.check_name_duplicate(
+        charityproject.name, session
+    )
     new_project = await charityproject_crud.create(charityproject, session)
-    donations_not_fully_invested = await donation_handler.ProjectDonation.get_donations_not_fully_invested(session)
-    if donations_not_fully_invested is not None:
-        project_full_amount = new_project.full_amount
-        project_full_amount_get = 'no'
-        sum_to_project = 0
-        for donation in donations_not_fully_invested:
-            if project_full_amount_get == 'yes':
-                break
-            donation_amount_to_get = donation.full_amount - donation.invested_amount
-            for _ in range(1, donation_amount_to_get + 1):
-                sum_to_project += 1
-                if project_full_amount == sum_to_project:
-                    project_full_amount_get = 'yes'
-                    break
-            donation = await check_donation_exists(donation.id, session)
-            close_date = datetime.now().isoformat(timespec='seconds')
-            obj_in = DonationUpdate(
-                invested_amount=sum_to_project,
-                fully_invested=1,
-                close_date=close_date
-            )
-            await donation_crud.update(donation, obj_in, session, commit_yes='no')
-            if project_full_amount_get == 'yes':
-                obj_in = CharityprojectUpdateThreeFields(
-                    invested_amount=sum_to_project,
-                    fully_invested=1,
-                    close_date=close_date
-                )
-                await charityproject_crud.update(new_project, obj_in, session, commit_yes='no')
-        await session.commit()
-        await session.refresh(new_project)
+    await donate(new_project, session)
+    await session.refresh(new_project)
     return new_project
 
 
@@ -141,20 +98,24 @@ async def partially_update_charityproject(
         HTTPException: Если произошла ошибка при обновлении проекта.
     """
 
-    charityproject = await check_charityproject_exists(
+    charityproject = await CharityProjectValidator.get_if_exists(
         project_id, session
     )
+    await CharityProjectValidator.check_project_is_closed(charityproject)
 
-    if not obj_in.name and obj_in.description is not None and obj_in.full_amount is None:
-        raise HTTPException(
-            HTTPStatus.UNPROCESSABLE_ENTITY == 422,
-            detail='Не переданы значения полей!'
+    if obj_in.name and obj_in.name != charityproject.name:
+        await CharityProjectValidator.check_name_duplicate(
+            obj_in.name, session
         )
-    await check_project_unic_name(project_id, session, obj_in.name)
-    await check_project_fully_invested(project_id, session, 'редактировать')
 
     if obj_in.full_amount is not None:
-        await check_project_invested_amount(project_id, session, 2, obj_in.full_amount)
+        project_is_full = await CharityProjectValidator.is_full_amount(
+            amount=obj_in.full_amount,
+            project_id=project_id,
+            session=session
+        )
+        if project_is_full:
+            await close(charityproject)
 
     charityproject = await charityproject_crud.update(
         charityproject, obj_in, session
@@ -185,9 +146,9 @@ async def remove_charityproject(
         HTTPException: Если произошла ошибка при удалении проекта.
     """
 
-    """Только для суперюзеров."""
-    charityproject = await check_project_invested_amount(project_id, session)
-    charityproject = await check_project_fully_invested(project_id, session, 'удалять')
-    charityproject = await check_charityproject_exists(project_id, session)
-    charityproject = await charityproject_crud.remove(charityproject, session)
-    return charityproject
+    charityproject = await CharityProjectValidator.get_if_exists(
+        project_id, session
+    )
+    await CharityProjectValidator.check_project_is_donated(charityproject)
+    await CharityProjectValidator.check_project_is_closed(charityproject)
+    return await charityproject_crud.delete(charityproject, session)
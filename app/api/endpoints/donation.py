@@ -1,14 +1,26 @@
-from fastapi import APIRouter, Depends
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.pagination import Page, sparse_fields
+from app.core.config import settings
 from app.core.db import get_async_session
-from app.core.user import current_user
+from app.core.user import current_superuser, current_user
 from app.crud.donation import donation_crud
-from app.models import User
+from app.crud.investment import investment_crud
+from app.models import Donation, User
 from app.schemas.donation import (
-    DonationCreate, DonationDB, DonationDBBase
+    DonationCreate, DonationDB, DonationDBBase, DonationImportSummary
 )
+from app.schemas.investment import InvestmentDB
 from app.services.charity_services import donate
+from app.services.donation_batcher import donation_batcher
+from app.services.donation_import import import_donations
+from app.services.export import (
+    MEDIA_TYPES, ExportFormat, export_rows, rows_response
+)
 
 
 router = APIRouter()
@@ -25,6 +37,8 @@ async def create_donation(
         session: AsyncSession = Depends(get_async_session),
 ):
     """Создать пожертвование от текущего пользователя."""
+    if settings.donation_batch_window_ms:
+        return await donation_batcher.submit(donation, user)
     new_donation = await donation_crud.create(donation, session, user)
     await donate(new_donation, session)
     await session.refresh(new_donation)
@@ -37,10 +51,40 @@ async def create_donation(
     response_model_exclude_none=True,
 )
 async def get_all_donations(
+        request: Request,
+        response: Response,
+        page: Page = Depends(),
+        fields: Optional[list[str]] = Depends(sparse_fields(DonationDB)),
+        session: AsyncSession = Depends(get_async_session),
+):
+    """Получить список пожертвований постранично,
+    с fields — только перечисленные поля."""
+    donations = page.respond(
+        await donation_crud.get_multi(session, fields=fields, **page.seek),
+        request, response,
+    )
+    if fields:
+        return rows_response(
+            fields, donations, page.headers, Donation.__tablename__
+        )
+    return donations
+
+
+@router.get(
+    '/export',
+    response_class=StreamingResponse,
+    dependencies=[Depends(current_superuser)],
+)
+async def export_donations(
+        export_format: ExportFormat = Query('ndjson', alias='format'),
         session: AsyncSession = Depends(get_async_session),
 ):
-    """Получить список всех пожертвований."""
-    return await donation_crud.get_multi(session)
+    """Выгрузить все пожертвования потоком NDJSON или JSON-массива.
+    Только для суперпользователей."""
+    return StreamingResponse(
+        export_rows(Donation, DonationDB, session, export_format),
+        media_type=MEDIA_TYPES[export_format],
+    )
 
 
 @router.get(
@@ -50,8 +94,55 @@ async def get_all_donations(
     response_model_exclude={'user_id'},
 )
 async def get_current_user_donations(
+        request: Request,
+        response: Response,
+        page: Page = Depends(),
+        fields: Optional[list[str]] = Depends(
+            sparse_fields(DonationDBBase)
+        ),
         user: User = Depends(current_user),
         session: AsyncSession = Depends(get_async_session),
 ):
-    """Получить все пожертвования текущего пользователя."""
-    return await donation_crud.get_for_user(user, session)
+    """Получить пожертвования текущего пользователя постранично,
+    с fields — только перечисленные поля."""
+    donations = page.respond(
+        await donation_crud.get_for_user(
+            user, session, fields=fields, **page.seek
+        ),
+        request, response,
+    )
+    if fields:
+        return rows_response(
+            fields, donations, page.headers, Donation.__tablename__
+        )
+    return donations
+
+
+@router.get(
+    '/{donation_id}/investments',
+    response_model=list[InvestmentDB],
+    dependencies=[Depends(current_superuser)],
+)
+async def get_donation_investments(
+        donation_id: int,
+        session: AsyncSession = Depends(get_async_session),
+):
+    """Получить проекты, в которые ушло пожертвование.
+    Только для суперпользователей."""
+    return await investment_crud.get_for_donation(donation_id, session)
+
+
+@router.post(
+    '/import',
+    response_model=DonationImportSummary,
+    dependencies=[Depends(current_superuser)],
+)
+async def import_donations_stream(
+        request: Request,
+        session: AsyncSession = Depends(get_async_session),
+):
+    """Потоковый импорт пожертвований из NDJSON или CSV.
+    Только для суперпользователей."""
+    return await import_donations(
+        request.stream(), request.headers.get('content-type', ''), session
+    )
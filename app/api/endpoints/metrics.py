@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import get_async_session
+from app.core.metrics import render
+from app.services.open_queue import open_queue
+
+router = APIRouter()
+
+
+@router.get('/metrics', response_class=PlainTextResponse)
+async def get_metrics(
+        session: AsyncSession = Depends(get_async_session),
+):
+    """Метрики процесса в текстовом формате Prometheus."""
+    depth = await open_queue.depth(session)
+    return PlainTextResponse(
+        render(
+            (model.__tablename__, count) for model, count in depth.items()
+        ),
+        media_type='text/plain; version=0.0.4',
+    )
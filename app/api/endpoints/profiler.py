@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from starlette.routing import Route
+
+from app.core.user import current_superuser
+from app.schemas.profiler import ProfilerReport, ProfilerStart
+from app.services.profiler import profiler
+
+
+class Messages:
+    already_running = 'Профилирование уже запущено!'
+    route_not_found = 'Маршрут не найден!'
+    not_started = 'Профилирование ещё не запускалось!'
+
+
+router = APIRouter(dependencies=[Depends(current_superuser)])
+
+
+@router.post('/', response_model=ProfilerReport)
+async def start_profiler(
+        obj_in: ProfilerStart,
+        request: Request,
+):
+    """Профилировать следующие запросы к маршруту.
+    Только для суперпользователей."""
+    if profiler.running:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=Messages.already_running,
+        )
+    routes = [
+        route for route in request.app.routes
+        if isinstance(route, Route) and route.path == obj_in.route and (
+            obj_in.method is None or obj_in.method.upper() in route.methods
+        )
+    ]
+    if not routes:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=Messages.route_not_found,
+        )
+    profiler.start(obj_in, routes)
+    return profiler.report()
+
+
+@router.get('/', response_model=ProfilerReport)
+async def get_profiler_report():
+    """Состояние и результат профилирования.
+    Только для суперпользователей."""
+    if profiler.settings is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=Messages.not_started,
+        )
+    return profiler.report()
+
+
+@router.delete('/', response_model=ProfilerReport)
+async def stop_profiler():
+    """Остановить профилирование досрочно и получить результат.
+    Только для суперпользователей."""
+    if profiler.settings is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=Messages.not_started,
+        )
+    if not profiler.in_flight:
+        profiler.finish()
+    return profiler.report()
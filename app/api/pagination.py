@@ -0,0 +1,130 @@
+import binascii
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from typing import Awaitable, Callable, Optional, Type
+
+from fastapi import Depends, HTTPException, Query, Request, Response, status
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.core.user import deferred_current_user
+from app.models import User
+
+CURSOR_PREFIX = 'id:'
+
+
+class Messages:
+    invalid_cursor = 'Некорректный курсор страницы!'
+    unpaginated_for_superuser = (
+        'Список без разбиения на страницы доступен только суперпользователям!'
+    )
+    unknown_fields = 'Неизвестные поля: {}!'
+
+
+def encode_cursor(last_id: int) -> str:
+    return urlsafe_b64encode(
+        f'{CURSOR_PREFIX}{last_id}'.encode()
+    ).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        value = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        if not value.startswith(CURSOR_PREFIX):
+            raise ValueError
+        return int(value[len(CURSOR_PREFIX):])
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=Messages.invalid_cursor,
+        )
+
+
+async def unpaginated_query(
+    unpaginated: bool = Query(False, alias='all'),
+    current_user: Callable[[], Awaitable[Optional[User]]] = Depends(
+        deferred_current_user
+    ),
+) -> bool:
+    """Параметр all=true; пользователь проверяется только при нём."""
+    if not unpaginated:
+        return False
+    user = await current_user()
+    if not (user and user.is_superuser):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=Messages.unpaginated_for_superuser,
+        )
+    return True
+
+
+class Page:
+    """Страница списка по ключу id: limit строк после курсора after.
+
+    Тело ответа остаётся списком, ссылка на следующую страницу
+    передаётся в заголовках Link (rel="next") и X-Next-Cursor.
+    Параметр all=true отдаёт весь список одним ответом и доступен
+    только суперпользователям.
+    """
+
+    def __init__(
+        self,
+        limit: int = Query(
+            settings.page_size, ge=1, le=settings.page_size_max
+        ),
+        after: Optional[str] = None,
+        unpaginated: bool = Depends(unpaginated_query),
+    ):
+        self.limit = None if unpaginated else limit
+        self.after = decode_cursor(after) if after else None
+        self.headers: dict[str, str] = {}
+
+    @property
+    def seek(self) -> dict:
+        """Аргументы выборки; лишняя строка показывает, есть ли продолжение."""
+        return dict(
+            limit=self.limit + 1 if self.limit else None, after=self.after
+        )
+
+    def respond(self, items: list, request: Request, response: Response):
+        """Обрезать выборку до страницы и выставить ссылку на следующую."""
+        if self.limit is None or len(items) <= self.limit:
+            return items
+        items = items[:self.limit]
+        cursor = encode_cursor(items[-1].id)
+        self.headers['X-Next-Cursor'] = cursor
+        self.headers['Link'] = '<{}>; rel="next"'.format(
+            request.url.include_query_params(after=cursor)
+        )
+        response.headers.update(self.headers)
+        return items
+
+
+def sparse_fields(
+    schema: Type[BaseModel],
+    exclude: tuple = (),
+) -> Callable[..., Optional[list[str]]]:
+    """Зависимость, разбирающая ?fields=a,b по полям схемы ответа.
+
+    Возвращает список полей (id всегда первым). Без параметра возвращает
+    все поля схемы в её порядке, если включён FAST_LIST_RESPONSES, иначе
+    None — ответ идёт обычным путём через response_model.
+    """
+    allowed = [name for name in schema.__fields__ if name not in exclude]
+
+    def dependency(
+        fields: Optional[str] = Query(
+            None, description=f'Поля через запятую: {", ".join(allowed)}'
+        ),
+    ) -> Optional[list[str]]:
+        if fields is None:
+            return allowed if settings.fast_list_responses else None
+        names = [name.strip() for name in fields.split(',') if name.strip()]
+        unknown = [name for name in names if name not in allowed]
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=Messages.unknown_fields.format(', '.join(unknown)),
+            )
+        return list(dict.fromkeys(['id', *names]))
+
+    return dependency
@@ -1,7 +1,8 @@
 from fastapi import APIRouter
 
 from app.api.endpoints import (
-    charity_project_router, donation_router, user_router
+    charity_project_router, donation_router, metrics_router, profiler_router,
+    user_router
 )
 
 
@@ -13,3 +14,7 @@ main_router.include_router(
     donation_router, prefix='/donation', tags=['Donation']
 )
 main_router.include_router(user_router)
+main_router.include_router(metrics_router, tags=['Metrics'])
+main_router.include_router(
+    profiler_router, prefix='/profiler', tags=['Profiler']
+)
@@ -2,6 +2,7 @@ from fastapi import HTTPException, status
 from pydantic import PositiveInt
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.tracing import traced
 from app.crud.charity_project import charity_project_crud
 from app.models import CharityProject
 
@@ -19,6 +20,7 @@ class Messages:
 class CharityProjectValidator:
 
     @staticmethod
+    @traced
     async def get_if_exists(
             project_id: int,
             session: AsyncSession,
@@ -35,6 +37,7 @@ class CharityProjectValidator:
         return project
 
     @staticmethod
+    @traced
     async def check_name_duplicate(
         project_name: str,
         session: AsyncSession,
@@ -51,6 +54,24 @@ class CharityProjectValidator:
             )
 
     @staticmethod
+    @traced
+    async def check_names_duplicate(
+        project_names: list[str],
+        session: AsyncSession,
+    ) -> None:
+        """Проверяет названия новых проектов одним запросом,
+        иначе вызывает ошибку 400"""
+        duplicates = len(set(project_names)) != len(project_names)
+        if duplicates or await charity_project_crud.get_existing_names(
+            project_names, session
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=Messages.duplicate_name,
+            )
+
+    @staticmethod
+    @traced
     async def check_project_is_donated(project: CharityProject) -> None:
         """Проверяет, что в проект были внесены пожертвования."""
         if project.invested_amount:
@@ -60,6 +81,7 @@ class CharityProjectValidator:
             )
 
     @staticmethod
+    @traced
     async def is_full_amount(
         amount: PositiveInt,
         project_id: int,
@@ -77,6 +99,7 @@ class CharityProjectValidator:
         return amount == project.invested_amount
 
     @staticmethod
+    @traced
     async def check_project_is_closed(project: CharityProject) -> None:
         """Вызывает ошибку при попытке удалить закрытый проект."""
         if project.fully_invested:
@@ -0,0 +1,231 @@
+"""Кэши внутри процесса: ответы GET, закодированные строки списков,
+пользователи для проверки токена."""
+import time
+from collections import OrderedDict
+from hashlib import blake2b
+from typing import Any, Hashable, NamedTuple, Optional
+from urllib.parse import urlencode
+
+from fastapi import Request, Response, status
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import Counter, response_cache_requests
+
+CACHED_HEADERS = ('link', 'x-next-cursor')
+
+
+class DataVersion:
+    """Номер версии данных: растёт после каждого commit, который что-то
+    записал, — через ORM (create, update, delete) или DML-запросом
+    (распределение, импорт, пересчёт)."""
+
+    def __init__(self):
+        self.value = 0
+
+    def bump(self) -> None:
+        self.value += 1
+
+
+data_version = DataVersion()
+
+
+@event.listens_for(Session, 'after_flush')
+def mark_flushed(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def mark_dml(orm_execute_state):
+    if (
+        orm_execute_state.is_insert or
+        orm_execute_state.is_update or
+        orm_execute_state.is_delete
+    ):
+        orm_execute_state.session.info['wrote'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def bump_data_version(session):
+    if session.info.pop('wrote', False):
+        data_version.bump()
+
+
+@event.listens_for(Session, 'after_rollback')
+def forget_writes(session):
+    session.info.pop('wrote', None)
+
+
+class CachedResponse(NamedTuple):
+    version: int
+    etag: str
+    body: bytes
+    media_type: str
+    headers: dict
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or etag in (tag.removeprefix('W/') for tag in tags)
+
+
+class ResponseCache:
+    """Готовые тела ответов по пути и параметрам запроса, LRU.
+
+    Запись годна, пока не изменилась версия данных. Версия берётся до
+    чтения из БД, поэтому ответ, собранный во время записи, сохраняется
+    под старой версией и сразу считается устаревшим.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries: OrderedDict[str, CachedResponse] = OrderedDict()
+
+    @staticmethod
+    def key(request: Request) -> str:
+        return '{}?{}'.format(
+            request.url.path,
+            urlencode(sorted(request.query_params.multi_items())),
+        )
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    def get(self, request: Request) -> Optional[Response]:
+        """Ответ из кэша (200 или 304) или None."""
+        if not self.max_size:
+            return None
+        key = self.key(request)
+        entry = self.entries.get(key)
+        if entry is None or entry.version != data_version.value:
+            response_cache_requests.inc('miss')
+            return None
+        response_cache_requests.inc('hit')
+        self.entries.move_to_end(key)
+        return self.respond(request, entry)
+
+    def put(
+        self,
+        request: Request,
+        version: int,
+        response: Response,
+    ) -> Response:
+        """Сохранить ответ, собранный для версии данных version."""
+        if not self.max_size:
+            return response
+        entry = CachedResponse(
+            version,
+            '"{}"'.format(blake2b(response.body, digest_size=16).hexdigest()),
+            response.body,
+            response.media_type,
+            {
+                name: value for name, value in response.headers.items()
+                if name in CACHED_HEADERS
+            },
+        )
+        if version == data_version.value:
+            key = self.key(request)
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return self.respond(request, entry)
+
+    @staticmethod
+    def respond(request: Request, entry: CachedResponse) -> Response:
+        headers = dict(
+            entry.headers, etag=entry.etag, **{'cache-control': 'no-cache'}
+        )
+        if etag_matches(request.headers.get('if-none-match'), entry.etag):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED, headers=headers
+            )
+        return Response(
+            entry.body, media_type=entry.media_type, headers=headers
+        )
+
+
+response_cache = ResponseCache(settings.response_cache_size)
+
+
+class FragmentCache:
+    """Строки списков, закодированные в JSON, по (таблица, поля, id), LRU.
+
+    Версией строки служат значения её выбранных столбцов: фрагмент
+    годен, пока они совпадают с прочитанными из БД. Так после записи
+    перекодируются только изменённые строки, кто бы их ни изменил —
+    распределение, пакетный импорт или пересчёт.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries: OrderedDict[tuple, tuple[tuple, bytes]] = OrderedDict()
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    def get(self, key: tuple, values: tuple) -> Optional[bytes]:
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != values:
+            return None
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: tuple, values: tuple, fragment: bytes) -> bytes:
+        self.entries[key] = (values, fragment)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return fragment
+
+
+fragment_cache = FragmentCache(settings.fragment_cache_size)
+
+
+class TTLCache:
+    """Значения по ключу со сроком жизни ttl секунд, LRU.
+
+    Значение, прочитанное до discard того же ключа, put не сохранит:
+    перед чтением из БД берётся generation, и put с устаревшим номером
+    игнорируется.
+    """
+
+    def __init__(self, max_size: int, ttl: float, requests: Counter):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.requests = requests
+        self.generation = 0
+        self.entries: OrderedDict[Hashable, tuple[float, Any]] = (
+            OrderedDict()
+        )
+
+    def clear(self) -> None:
+        self.generation += 1
+        self.entries.clear()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if not self.max_size:
+            return None
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self.entries.pop(key, None)
+            self.requests.inc('miss')
+            return None
+        self.requests.inc('hit')
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any, generation: int) -> None:
+        if not self.max_size or generation != self.generation:
+            return
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def discard(self, key: Hashable) -> None:
+        self.generation += 1
+        self.entries.pop(key, None)
@@ -1,3 +1,5 @@
+from typing import Literal, Optional
+
 from pydantic import BaseSettings
 
 
@@ -7,6 +9,42 @@ class Settings(BaseSettings):
     database_url: str = 'sqlite+aiosqlite:///./qr_cat.db'
     secret: str = 'SECRET'
     token_lifetime = 3600
+    # orm — загрузка открытых объектов из БД на каждое распределение,
+    # memory — резидентные очереди открытых объектов (один процесс),
+    # window — расчёт нарастающим итогом в SQL оконной функцией.
+    allocation_backend: Literal['orm', 'memory', 'window'] = 'orm'
+    # Распределения выполняются по очереди одной фоновой задачей.
+    allocation_single_writer: bool = True
+    # Размер порции открытых строк, читаемой при распределении.
+    allocation_fetch_size: int = 100
+    # Окно накопления пожертвований в пакет, 0 — без пакетов.
+    donation_batch_window_ms: int = 0
+    donation_batch_size: int = 100
+    # Размер пачки потокового импорта пожертвований.
+    donation_import_chunk_size: int = 1000
+    # Размер страницы списков по умолчанию и наибольший допустимый.
+    page_size: int = 100
+    page_size_max: int = 1000
+    # Списки кодируются из строк выборки через orjson, минуя
+    # response_model; форма JSON та же.
+    fast_list_responses: bool = False
+    # Число ответов GET /charity_project/ в кэше с ETag, 0 — без кэша.
+    response_cache_size: int = 256
+    # Число закодированных строк списков в кэше, 0 — без кэша.
+    fragment_cache_size: int = 10000
+    # Число активных пользователей в кэше проверки токена и срок жизни
+    # записи в секундах, 0 — без кэша.
+    user_cache_size: int = 1024
+    user_cache_ttl: float = 60
+    # Размер порции строк потоковой выгрузки таблиц.
+    export_chunk_size: int = 1000
+    # Порог медленного SQL-запроса и файл JSON-lines для таких запросов,
+    # пустое значение — не писать журнал.
+    sql_slow_query_ms: int = 100
+    sql_slow_query_log: Optional[str] = None
+    # Доля запросов, для которых пишется трасса, и файл трасс OTLP/JSON.
+    trace_sample_rate: float = 0.0
+    trace_export_path: Optional[str] = None
 
     class Config:
         env_file = '.env'
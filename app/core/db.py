@@ -1,8 +1,21 @@
-from sqlalchemy import Column, Integer
+import json
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import Column, Integer, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import declarative_base, declared_attr, sessionmaker
+from sqlalchemy.orm import (
+    Session, declarative_base, declared_attr, sessionmaker
+)
 
 from app.core.config import settings
+from app.core.tracing import end_span, start_span
+
+logger = logging.getLogger('app.sql')
+slow_query_logger = logging.getLogger('app.sql.slow')
 
 
 class PreBase:
@@ -22,3 +35,106 @@ AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession)
 async def get_async_session():
     async with AsyncSessionLocal() as async_session:
         yield async_session
+
+
+class QueryStats:
+    """Число SQL-запросов и время в БД одного HTTP-запроса."""
+    __slots__ = ('scope', 'statements', 'duration')
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.scope = scope or {}
+        self.statements = 0
+        self.duration = 0.0
+
+    @property
+    def endpoint(self) -> Optional[str]:
+        """Метод и шаблон пути маршрута, когда он уже найден."""
+        if 'method' not in self.scope:
+            return None
+        route = self.scope.get('route')
+        path = route.path if route else self.scope.get('path')
+        return f'{self.scope["method"]} {path}'
+
+
+query_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    'query_stats', default=None
+)
+
+
+def redact(parameters):
+    """Заменить значения параметров запроса их типами."""
+    if isinstance(parameters, dict):
+        return {
+            key: type(value).__name__ for key, value in parameters.items()
+        }
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany: формы первой строки и числа строк достаточно.
+            return dict(rows=len(parameters), first=redact(parameters[0]))
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+if settings.sql_slow_query_log:
+    handler = logging.FileHandler(settings.sql_slow_query_log)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    slow_query_logger.addHandler(handler)
+    slow_query_logger.setLevel(logging.INFO)
+    slow_query_logger.propagate = False
+
+
+@event.listens_for(Session, 'before_commit')
+def start_commit_span(session):
+    session.info['commit_span'] = start_span('session.commit')
+
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_rollback')
+def end_commit_span(session):
+    end_span(session.info.pop('commit_span', None))
+
+
+# Слушатели висят на классе Engine, поэтому считаются запросы любого
+# движка, в том числе подменённого в тестах через get_async_session.
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_query_timer(conn, cursor, statement, parameters, context, many):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+    conn.info.setdefault('query_spans', []).append(
+        start_span('sql', statement=statement)
+    )
+
+
+@event.listens_for(Engine, 'handle_error')
+def drop_query_timer(exception_context):
+    # after_cursor_execute не вызывается, если запрос упал: иначе таймер
+    # и интервал остались бы в соединении пула навсегда.
+    conn = exception_context.connection
+    if conn is None or not conn.info.get('query_started'):
+        return
+    conn.info['query_started'].pop()
+    span = conn.info['query_spans'].pop()
+    if span is not None:
+        span.attributes['error'] = type(
+            exception_context.original_exception
+        ).__name__
+    end_span(span)
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def stop_query_timer(conn, cursor, statement, parameters, context, many):
+    duration = time.perf_counter() - conn.info['query_started'].pop()
+    end_span(conn.info['query_spans'].pop())
+    stats = query_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.duration += duration
+    if (
+        duration * 1000 >= settings.sql_slow_query_ms and
+        slow_query_logger.isEnabledFor(logging.INFO)
+    ):
+        slow_query_logger.info(json.dumps(dict(
+            statement=statement,
+            parameters=redact(parameters),
+            duration_ms=round(duration * 1000, 3),
+            endpoint=stats.endpoint if stats else None,
+        ), ensure_ascii=False))
@@ -0,0 +1,219 @@
+"""Метрики процесса в текстовом формате Prometheus.
+
+Все значения меняются из потока цикла событий, поэтому обновление —
+это поиск корзины и увеличение элемента списка без блокировок.
+"""
+from bisect import bisect_left
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import Pool
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+ROWS_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+
+def format_labels(names: tuple, values: tuple, **extra) -> str:
+    pairs = [*zip(names, values), *extra.items()]
+    if not pairs:
+        return ''
+    return '{%s}' % ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', r'\\').replace('"', r'\"')
+        ) for name, value in pairs
+    )
+
+
+class Metric:
+    kind = ''
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+
+    def header(self) -> list[str]:
+        return [
+            f'# HELP {self.name} {self.help}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        super().__init__(name, help, labels)
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def collect(self) -> list[str]:
+        return self.header() + [
+            f'{self.name}{format_labels(self.labels, labels)} {value}'
+            for labels, value in self.values.items()
+        ]
+
+
+class Gauge(Metric):
+    """Значение, которое вычисляется в момент сбора метрик."""
+    kind = 'gauge'
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple = (),
+        read: Optional[Callable[[], Iterable[tuple]]] = None,
+    ):
+        super().__init__(name, help, labels)
+        self.read = read
+
+    def collect(self, values: Optional[Iterable[tuple]] = None) -> list[str]:
+        values = self.read() if values is None else values
+        return self.header() + [
+            f'{self.name}{format_labels(self.labels, labels)} {value}'
+            for *labels, value in values
+        ]
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple = (),
+        buckets: tuple = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+        # Для каждого набора меток: счётчики корзин (последняя — +Inf)
+        # и сумма наблюдений.
+        self.series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def collect(self) -> list[str]:
+        lines = self.header()
+        for labels, (counts, total) in self.series.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                lines.append(
+                    f'{self.name}_bucket'
+                    f'{format_labels(self.labels, labels, le=bound)} '
+                    f'{cumulative}'
+                )
+            suffix = format_labels(self.labels, labels)
+            lines.append(f'{self.name}_sum{suffix} {total}')
+            lines.append(f'{self.name}_count{suffix} {cumulative}')
+        return lines
+
+
+request_latency = Histogram(
+    'qrkot_request_duration_seconds',
+    'Время обработки HTTP-запроса.',
+    ('method', 'route'),
+)
+allocation_latency = Histogram(
+    'qrkot_allocation_duration_seconds',
+    'Время donate() вместе с ожиданием очереди распределения.',
+    ('backend',),
+)
+allocation_rows = Histogram(
+    'qrkot_allocation_rows_touched',
+    'Число строк, заполненных одним распределением.',
+    ('backend',),
+    buckets=ROWS_BUCKETS,
+)
+pool_checkouts = Counter(
+    'qrkot_sql_pool_checkouts_total',
+    'Выдачи соединений из пула.',
+)
+pool_connects = Counter(
+    'qrkot_sql_pool_connects_total',
+    'Новые соединения, открытые пулом при выдаче.',
+)
+pool_checkins = Counter(
+    'qrkot_sql_pool_checkins_total',
+    'Возвраты соединений в пул.',
+)
+commits = Counter(
+    'qrkot_sql_commits_total',
+    'Зафиксированные транзакции сессий.',
+)
+response_cache_requests = Counter(
+    'qrkot_response_cache_requests_total',
+    'Обращения к кэшу ответов GET.',
+    ('result',),
+)
+fragment_cache_rows = Counter(
+    'qrkot_fragment_cache_rows_total',
+    'Строки списков, взятые из кэша фрагментов или закодированные заново.',
+    ('result',),
+)
+user_cache_requests = Counter(
+    'qrkot_user_cache_requests_total',
+    'Обращения к кэшу пользователей при проверке токена.',
+    ('result',),
+)
+open_queue_depth = Gauge(
+    'qrkot_open_queue_depth',
+    'Незакрытые проекты и пожертвования.',
+    ('model',),
+)
+pool_checked_out = Gauge(
+    'qrkot_sql_pool_checked_out',
+    'Соединения, выданные из пула и ещё не возвращённые.',
+    read=lambda: [(
+        sum(pool_checkouts.values.values()) -
+        sum(pool_checkins.values.values()),
+    )],
+)
+
+METRICS = (
+    request_latency, allocation_latency, allocation_rows,
+    pool_checkouts, pool_connects, pool_checkins, pool_checked_out, commits,
+    response_cache_requests, fragment_cache_rows, user_cache_requests,
+)
+
+
+@event.listens_for(Pool, 'connect')
+def count_connect(dbapi_connection, connection_record):
+    pool_connects.inc()
+
+
+@event.listens_for(Pool, 'checkout')
+def count_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_checkouts.inc()
+
+
+@event.listens_for(Pool, 'checkin')
+def count_checkin(dbapi_connection, connection_record):
+    pool_checkins.inc()
+
+
+@event.listens_for(Session, 'after_commit')
+def count_commit(session):
+    commits.inc()
+
+
+def render(queue_depth: Iterable[tuple]) -> str:
+    """Все метрики в текстовом формате экспозиции Prometheus."""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.collect())
+    lines.extend(open_queue_depth.collect(queue_depth))
+    return '\n'.join(lines) + '\n'
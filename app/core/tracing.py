@@ -0,0 +1,142 @@
+"""Вложенные интервалы (spans) обработки запроса.
+
+Решение о записи принимается один раз на запрос с вероятностью
+TRACE_SAMPLE_RATE; в незаписываемых запросах каждый интервал стоит одного
+чтения ContextVar. Записанная трасса выгружается одной строкой в формате
+OTLP/JSON (ExportTraceServiceRequest) в журнал app.trace, который при
+заданном TRACE_EXPORT_PATH пишется в файл.
+"""
+import json
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Optional
+
+from app.core.config import settings
+
+trace_logger = logging.getLogger('app.trace')
+
+if settings.trace_export_path:
+    handler = logging.FileHandler(settings.trace_export_path)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    trace_logger.addHandler(handler)
+    trace_logger.setLevel(logging.INFO)
+    trace_logger.propagate = False
+
+
+class Span:
+    __slots__ = (
+        'spans', 'trace_id', 'span_id', 'parent_id', 'name', 'start', 'end',
+        'attributes',
+    )
+
+    def __init__(
+        self,
+        name: str,
+        parent: Optional['Span'] = None,
+        **attributes,
+    ):
+        # Все интервалы трассы собираются в общий список корня.
+        self.spans = parent.spans if parent else []
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else ''
+        self.name = name
+        self.attributes = attributes
+        self.start = time.time_ns()
+        self.end = None
+        self.spans.append(self)
+
+    def to_otlp(self) -> dict:
+        return dict(
+            traceId=self.trace_id,
+            spanId=self.span_id,
+            parentSpanId=self.parent_id,
+            name=self.name,
+            kind=1,
+            startTimeUnixNano=str(self.start),
+            endTimeUnixNano=str(self.end),
+            attributes=[
+                dict(key=key, value=dict(stringValue=str(value)))
+                for key, value in self.attributes.items()
+            ],
+        )
+
+
+current_span: ContextVar[Optional[Span]] = ContextVar(
+    'current_span', default=None
+)
+
+
+def start_span(name: str, **attributes) -> Optional[Span]:
+    """Открыть дочерний интервал, не делая его текущим."""
+    parent = current_span.get()
+    if parent is None:
+        return None
+    return Span(name, parent, **attributes)
+
+
+def end_span(span: Optional[Span]) -> None:
+    if span is not None:
+        span.end = time.time_ns()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Интервал вокруг блока кода, вложенные интервалы станут его детьми."""
+    child = start_span(name, **attributes)
+    if child is None:
+        yield None
+        return
+    token = current_span.set(child)
+    try:
+        yield child
+    finally:
+        current_span.reset(token)
+        end_span(child)
+
+
+def traced(function):
+    """Обернуть корутину в интервал с её квалифицированным именем."""
+    name = function.__qualname__
+
+    @wraps(function)
+    async def wrapper(*args, **kwargs):
+        if current_span.get() is None:
+            return await function(*args, **kwargs)
+        with span(name):
+            return await function(*args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def trace_request(name: str):
+    """Корневой интервал запроса, если запрос попал в выборку."""
+    if random.random() >= settings.trace_sample_rate:
+        yield None
+        return
+    root = Span(name)
+    token = current_span.set(root)
+    try:
+        yield root
+    finally:
+        current_span.reset(token)
+        end_span(root)
+        export(root.spans)
+
+
+def export(spans: list[Span]) -> None:
+    trace_logger.info(json.dumps(dict(resourceSpans=[dict(
+        resource=dict(attributes=[dict(
+            key='service.name', value=dict(stringValue=settings.app_title),
+        )]),
+        scopeSpans=[dict(
+            scope=dict(name='app'),
+            spans=[span.to_otlp() for span in spans if span.end],
+        )],
+    )]), ensure_ascii=False))
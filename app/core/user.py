@@ -1,6 +1,6 @@
-from typing import Union
+from typing import Any, Awaitable, Callable, Optional, Union
 
-from fastapi import Depends
+from fastapi import Depends, Request
 from fastapi_users import (
     BaseUserManager, FastAPIUsers, IntegerIDMixin, InvalidPasswordException
 )
@@ -8,16 +8,58 @@ from fastapi_users.authentication import (
     AuthenticationBackend, BearerTransport, JWTStrategy
 )
 from fastapi_users_db_sqlalchemy import SQLAlchemyUserDatabase
+from sqlalchemy import inspect
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import TTLCache
 from app.core.config import settings
 from app.core.db import get_async_session
+from app.core.metrics import user_cache_requests
 from app.models.user import User
 from app.schemas.user import UserCreate
 
 
+user_cache = TTLCache(
+    settings.user_cache_size, settings.user_cache_ttl, user_cache_requests
+)
+
+
+class CachedUserDatabase(SQLAlchemyUserDatabase):
+    """SQLAlchemyUserDatabase, который берёт активных пользователей по id
+    из кэша, — так проверка токена обходится без запроса к БД.
+
+    Из кэша возвращается новый несвязанный с сессией объект User;
+    перед изменением или удалением он заменяется строкой из БД.
+    """
+
+    async def get(self, id: Any) -> Optional[User]:
+        values = user_cache.get(id)
+        if values is not None:
+            return self.user_table(**values)
+        generation = user_cache.generation
+        user = await super().get(id)
+        if user is not None and user.is_active:
+            user_cache.put(id, {
+                column.key: getattr(user, column.key)
+                for column in inspect(self.user_table).column_attrs
+            }, generation)
+        return user
+
+    async def attached(self, user: User) -> User:
+        if inspect(user).transient:
+            return await super().get(user.id)
+        return user
+
+    async def update(self, user: User, update_dict: dict) -> User:
+        return await super().update(await self.attached(user), update_dict)
+
+    async def delete(self, user: User) -> None:
+        user_cache.discard(user.id)
+        await super().delete(await self.attached(user))
+
+
 async def get_user_db(session: AsyncSession = Depends(get_async_session)):
-    yield SQLAlchemyUserDatabase(session, User)
+    yield CachedUserDatabase(session, User)
 
 
 bearer_transport = BearerTransport(tokenUrl='auth/jwt/login')
@@ -46,6 +88,12 @@ class UserManager(IntegerIDMixin, BaseUserManager[User, int]):
                 reason='Password should be at least 3 characters'
             )
 
+    async def on_after_update(
+        self, user: User, update_dict: dict, request: Optional[Request] = None
+    ) -> None:
+        # В том числе смена is_superuser и is_active.
+        user_cache.discard(user.id)
+
 
 async def get_user_manager(user_db=Depends(get_user_db)):
     yield UserManager(user_db)
@@ -58,3 +106,20 @@ fastapi_users = FastAPIUsers[User, int](
 
 current_user = fastapi_users.current_user(active=True)
 current_superuser = fastapi_users.current_user(active=True, superuser=True)
+
+
+async def deferred_current_user(
+    token: Optional[str] = Depends(bearer_transport.scheme),
+    strategy: JWTStrategy = Depends(get_jwt_strategy),
+    user_manager: UserManager = Depends(get_user_manager),
+) -> Callable[[], Awaitable[Optional[User]]]:
+    """Активный пользователь или None, но токен проверяется только
+    при вызове возвращённой корутины: для зависимостей, которым
+    пользователь нужен лишь при некоторых параметрах запроса."""
+    async def resolve() -> Optional[User]:
+        if token is None:
+            return None
+        user = await strategy.read_token(token, user_manager)
+        return user if user and user.is_active else None
+
+    return resolve
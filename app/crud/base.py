@@ -1,8 +1,9 @@
 from typing import Optional
 
-from sqlalchemy import select
+from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.tracing import span, traced
 from app.models import User
 
 
@@ -10,6 +11,7 @@ class CRUDBase:
     def __init__(self, model):
         self.model = model
 
+    @traced
     async def get_by_attribute(
             self,
             attribute_name: str,
@@ -21,10 +23,46 @@ class CRUDBase:
         db_obj = await session.execute(statement)
         return db_obj.scalars().first()
 
-    async def get_multi(self, session: AsyncSession):
-        db_objs = await session.execute(select(self.model))
+    @traced
+    async def get_by_ids(self, ids: list[int], session: AsyncSession):
+        db_objs = await session.execute(
+            select(self.model).where(
+                self.model.id.in_(ids)
+            ).order_by(self.model.id)
+        )
         return db_objs.scalars().all()
 
+    def seek(
+            self,
+            statement,
+            limit: Optional[int] = None,
+            after: Optional[int] = None,
+    ):
+        """Выборка по ключу id: строки после after в порядке id."""
+        if after is not None:
+            statement = statement.where(self.model.id > after)
+        return statement.order_by(self.model.id).limit(limit)
+
+    def select_fields(self, fields: Optional[list[str]] = None):
+        """Выборка объектов модели или, если заданы поля, только столбцов."""
+        if fields is None:
+            return select(self.model)
+        return select(*(getattr(self.model, field) for field in fields))
+
+    @traced
+    async def get_multi(
+            self,
+            session: AsyncSession,
+            limit: Optional[int] = None,
+            after: Optional[int] = None,
+            fields: Optional[list[str]] = None,
+    ):
+        db_objs = await session.execute(
+            self.seek(self.select_fields(fields), limit, after)
+        )
+        return db_objs.all() if fields else db_objs.scalars().all()
+
+    @traced
     async def create(
             self,
             obj_in,
@@ -37,5 +75,37 @@ class CRUDBase:
         db_obj = self.model(**obj_data)
         session.add(db_obj)
         await session.commit()
-        await session.refresh(db_obj)
+        with span('session.refresh'):
+            await session.refresh(db_obj)
         return db_obj
+
+    @traced
+    async def insert_multi(
+            self,
+            objs_data: list[dict],
+            session: AsyncSession,
+    ) -> list[int]:
+        """Вставить строки одним многострочным INSERT, без commit.
+
+        SQLite выдаёт строкам одного INSERT подряд идущие rowid, пока
+        транзакция держит блокировку записи, поэтому ключи вычисляются
+        по последнему rowid в порядке вставки.
+        """
+        inserted = await session.execute(
+            insert(self.model).values(objs_data)
+        )
+        last_id = inserted.lastrowid
+        return list(range(last_id - len(objs_data) + 1, last_id + 1))
+
+    @traced
+    async def create_multi(
+            self,
+            objs_data: list[dict],
+            session: AsyncSession,
+    ) -> list:
+        """Вставить объекты одним INSERT и прочитать их в порядке вставки."""
+        ids = await self.insert_multi(objs_data, session)
+        db_objs = await self.get_by_ids(ids, session)
+        if len(db_objs) != len(objs_data):
+            raise RuntimeError('Не удалось прочитать вставленные объекты')
+        return db_objs
@@ -4,13 +4,16 @@ from fastapi.encoders import jsonable_encoder
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.tracing import span, traced
 from app.crud.base import CRUDBase
 from app.models import CharityProject
 from app.schemas.charity_project import CharityProjectUpdate
+from app.services.open_queue import open_queue
 
 
 class CRUDCharityProject(CRUDBase):
 
+    @traced
     async def get_project_id_by_name(
             self,
             project_name: str,
@@ -24,22 +27,41 @@ class CRUDCharityProject(CRUDBase):
         db_project_id = await session.execute(statement)
         return db_project_id.scalars().first()
 
+    @traced
+    async def get_existing_names(
+            self,
+            project_names: list[str],
+            session: AsyncSession,
+    ) -> list[str]:
+        statement = select(
+            CharityProject.name
+        ).where(
+            CharityProject.name.in_(project_names)
+        )
+        db_names = await session.execute(statement)
+        return db_names.scalars().all()
+
+    @traced
     async def update(
             self,
             db_project: CharityProject,
             project_in: CharityProjectUpdate,
             session: AsyncSession
     ) -> CharityProject:
-        project_data = jsonable_encoder(db_project)
+        with span('jsonable_encoder'):
+            project_data = jsonable_encoder(db_project)
         update_data = project_in.dict(exclude_unset=True)
         for field in project_data:
             if field in update_data:
                 setattr(db_project, field, update_data[field])
         session.add(db_project)
         await session.commit()
-        await session.refresh(db_project)
+        with span('session.refresh'):
+            await session.refresh(db_project)
+        open_queue.sync(db_project)
         return db_project
 
+    @traced
     async def delete(
             self,
             db_project: CharityProject,
@@ -47,6 +69,7 @@ class CRUDCharityProject(CRUDBase):
     ) -> CharityProject:
         await session.delete(db_project)
         await session.commit()
+        open_queue.discard(db_project)
         return db_project
 
 
@@ -3,24 +3,11 @@ from typing import Optional
 from sqlalchemy import select, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.crud.base import CRUDBase
+from app.crud.charity_project import CRUDCharityProject
 from app.models.charity_project import CharityProject
 
 
-class CRUDCharityproject(CRUDBase):
-
-    async def get_project_id_by_name(
-            self,
-            project_name: str,
-            session: AsyncSession,
-    ) -> Optional[int]:
-        db_project_id = await session.execute(
-            select(CharityProject.id).where(
-                CharityProject.name == project_name
-            )
-        )
-        db_project_id = db_project_id.scalars().first()
-        return db_project_id
+class CRUDCharityproject(CRUDCharityProject):
 
     async def get_project_with_invested_amount(
             self,
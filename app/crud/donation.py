@@ -1,20 +1,29 @@
-from sqlalchemy import select
+from typing import Optional
+
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.tracing import traced
 from app.crud.base import CRUDBase
 from app.models import Donation, User
 
 
 class CRUDDonation(CRUDBase):
 
+    @traced
     async def get_for_user(
             self,
             user: User,
             session: AsyncSession,
+            limit: Optional[int] = None,
+            after: Optional[int] = None,
+            fields: Optional[list[str]] = None,
     ) -> list[Donation]:
-        statement = select(Donation).where(Donation.user_id == user.id)
+        statement = self.seek(
+            self.select_fields(fields).where(Donation.user_id == user.id),
+            limit, after,
+        )
         donations = await session.execute(statement)
-        return donations.scalars().all()
+        return donations.all() if fields else donations.scalars().all()
 
 
 donation_crud = CRUDDonation(Donation)
@@ -0,0 +1,63 @@
+from datetime import datetime
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.tracing import traced
+from app.crud.base import CRUDBase
+from app.models import Donation, Investment
+
+
+class CRUDInvestment(CRUDBase):
+
+    @traced
+    async def record(
+            self,
+            source_model: type,
+            ledger: list,
+            session: AsyncSession,
+    ) -> None:
+        """Записать тройки (источник, цель, сумма) одним INSERT, без commit."""
+        if not ledger:
+            return
+        created_at = datetime.now()
+        rows = []
+        for source, target, amount in ledger:
+            donation, project = (
+                (source, target) if source_model is Donation
+                else (target, source)
+            )
+            rows.append(dict(
+                donation_id=donation.id,
+                project_id=project.id,
+                amount=amount,
+                created_at=created_at,
+            ))
+        await session.execute(insert(Investment).values(rows))
+
+    @traced
+    async def get_for_project(
+            self,
+            project_id: int,
+            session: AsyncSession,
+    ) -> list[Investment]:
+        statement = select(Investment).where(
+            Investment.project_id == project_id
+        ).order_by(Investment.id)
+        investments = await session.execute(statement)
+        return investments.scalars().all()
+
+    @traced
+    async def get_for_donation(
+            self,
+            donation_id: int,
+            session: AsyncSession,
+    ) -> list[Investment]:
+        statement = select(Investment).where(
+            Investment.donation_id == donation_id
+        ).order_by(Investment.id)
+        investments = await session.execute(statement)
+        return investments.scalars().all()
+
+
+investment_crud = CRUDInvestment(Investment)
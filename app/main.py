@@ -1,8 +1,67 @@
-from fastapi import FastAPI
+import json
+import time
+
+from fastapi import FastAPI, Request
 
 from app.api.routers import main_router
 from app.core.config import settings
+from app.core.db import AsyncSessionLocal, QueryStats, logger, query_stats
+from app.core.metrics import request_latency
+from app.core.tracing import trace_request
+from app.services.charity_services import allocation_writer
+from app.services.open_queue import open_queue
+from app.services.profiler import profiler
 
 
 app = FastAPI(title=settings.app_title)
 app.include_router(main_router)
+
+
+@app.middleware('http')
+async def instrument_request(request: Request, call_next):
+    """Посчитать SQL-запросы обработчика и вернуть их в заголовках,
+    записать длительность запроса в метрики и трассу, если она пишется."""
+    stats = QueryStats(request.scope)
+    token = query_stats.set(stats)
+    profiled = profiler.begin(request.scope)
+    started = time.perf_counter()
+    try:
+        with trace_request(request.url.path) as root:
+            response = await call_next(request)
+            if root is not None:
+                root.name = stats.endpoint
+                root.attributes['http.status_code'] = response.status_code
+    finally:
+        query_stats.reset(token)
+        if profiled:
+            profiler.end()
+    route = request.scope.get('route')
+    request_latency.observe(
+        time.perf_counter() - started,
+        request.method,
+        route.path if route else 'unmatched',
+    )
+    sql_time_ms = round(stats.duration * 1000, 3)
+    response.headers['X-SQL-Statements'] = str(stats.statements)
+    response.headers['X-SQL-Time-Ms'] = str(sql_time_ms)
+    logger.info(json.dumps(dict(
+        endpoint=stats.endpoint,
+        status=response.status_code,
+        statements=stats.statements,
+        sql_time_ms=sql_time_ms,
+    ), ensure_ascii=False))
+    return response
+
+
+@app.on_event('startup')
+async def load_open_queue():
+    """Построить резидентные очереди распределения при старте."""
+    if settings.allocation_backend == 'memory':
+        async with AsyncSessionLocal() as session:
+            await open_queue.rebuild(session)
+
+
+@app.on_event('shutdown')
+async def stop_allocation_writer():
+    """Остановить фоновую задачу распределения."""
+    await allocation_writer.stop()
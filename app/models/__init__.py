@@ -1,3 +1,4 @@
 from .charity_project import CharityProject # noqa
 from .donation import Donation # noqa
+from .investment import Investment # noqa
 from .user import User # noqa
@@ -8,5 +8,6 @@ class Donation(FoundationBase):
     comment = Column(Text)
     user_id = Column(
         Integer,
-        ForeignKey('user.id',)
+        ForeignKey('user.id',),
+        index=True,
     )
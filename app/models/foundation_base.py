@@ -1,9 +1,12 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, Integer
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, text
+from sqlalchemy.orm import declared_attr
 
 from app.core.db import Base
 
+OPEN_ROWS = 'fully_invested = 0'
+
 
 class FoundationBase(Base):
     """Класс для наследования моделей CharityProject, Donation"""
@@ -14,3 +17,15 @@ class FoundationBase(Base):
     fully_invested = Column(Boolean, default=False)
     create_date = Column(DateTime, default=datetime.now)
     close_date = Column(DateTime)
+
+    @declared_attr
+    def __table_args__(cls):
+        # Частичный индекс только по открытым строкам в порядке очереди
+        # (create_date, id): закрытая история не увеличивает его размер.
+        return (
+            Index(
+                f'ix_{cls.__tablename__}_open_fifo', 'create_date', 'id',
+                sqlite_where=text(OPEN_ROWS),
+                postgresql_where=text('NOT fully_invested'),
+            ),
+        )
@@ -0,0 +1,13 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer
+
+from app.core.db import Base
+
+
+class Investment(Base):
+    """Запись журнала: какая сумма пожертвования ушла в какой проект"""
+    donation_id = Column(Integer, ForeignKey('donation.id'), index=True)
+    project_id = Column(Integer, ForeignKey('charityproject.id'), index=True)
+    amount = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
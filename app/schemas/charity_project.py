@@ -36,3 +36,19 @@ class CharityProjectDB(CharityProjectCreate):
 
     class Config:
         orm_mode = True
+
+
+class AllocationSimulationRequest(BaseModel):
+    full_amount: PositiveInt
+
+
+class SimulatedInvestment(BaseModel):
+    id: int
+    amount: int
+    fully_invested: bool
+
+
+class AllocationSimulation(BaseModel):
+    invested_amount: int
+    fully_invested: bool
+    used: list[SimulatedInvestment]
@@ -117,22 +117,6 @@ class CharityProjectResponse(CharityprojectBase):
         min_anystr_length = 1
 
 
-class CharityprojectUpdateThreeFields(BaseModel):
-    """
-    Модель для обновления трех полей благотворительных проектов.
-
-    Attributes:
-        invested_amount (int): Сумма, которая уже собрана.
-        fully_invested (bool): Флаг, показывающий, полностью ли проект собран.
-        close_date (datetime): Дата закрытия проекта (по умолчанию, текущая дата).
-
-    """
-
-    invested_amount: int = Field(1)
-    fully_invested: bool = Field(1)
-    close_date: datetime = Field(datetime.now().isoformat(timespec='seconds'))
-
-
 class CharityprojectCreate(CharityprojectBase):
     """
     Модель для создания новых благотворительных проектов.
@@ -22,3 +22,14 @@ class DonationDB(DonationDBBase):
     invested_amount: int
     fully_invested: bool
     close_date: Optional[datetime]
+
+
+class DonationImport(DonationCreate):
+    user_id: Optional[int]
+    create_date: Optional[datetime]
+
+
+class DonationImportSummary(BaseModel):
+    imported: int
+    allocated: int
+    projects_closed: int
@@ -0,0 +1,13 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class InvestmentDB(BaseModel):
+    donation_id: int
+    project_id: int
+    amount: int
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
@@ -0,0 +1,32 @@
+from typing import Literal, Optional
+
+from pydantic import (
+    BaseModel, Extra, PositiveFloat, PositiveInt, root_validator
+)
+
+
+class ProfilerStart(BaseModel):
+    route: str
+    method: Optional[str]
+    mode: Literal['cprofile', 'sampling'] = 'cprofile'
+    requests: Optional[PositiveInt]
+    seconds: Optional[PositiveFloat]
+
+    class Config:
+        extra = Extra.forbid
+
+    @root_validator(skip_on_failure=True)
+    def limit_required(cls, values):
+        if values['requests'] is None and values['seconds'] is None:
+            raise ValueError('Укажите число запросов или длительность!')
+        return values
+
+
+class ProfilerReport(BaseModel):
+    route: str
+    method: Optional[str]
+    mode: str
+    running: bool
+    profiled_requests: int
+    output: Optional[str]
+    memory: list[str]
@@ -0,0 +1,57 @@
+"""Арифметика распределения средств по принципу First In, First Out."""
+from collections import deque
+from datetime import datetime
+from typing import Optional
+
+from app.models import CharityProject, Donation
+
+OPPOSITE = {CharityProject: Donation, Donation: CharityProject}
+
+
+def fifo_order(model) -> tuple:
+    """Порядок очереди: дата создания, при совпадении — первичный ключ.
+
+    Первичный ключ растёт в порядке вставки, поэтому строки одной пачки
+    с одинаковой датой создания распределяются в порядке вставки. Порядок
+    обслуживается частичным индексом ix_<таблица>_open_fifo.
+    """
+    return model.create_date, model.id
+
+
+def remaining(obj) -> int:
+    """Сумма, которую объект ещё может принять или отдать."""
+    return obj.full_amount - (obj.invested_amount or 0)
+
+
+def mark_closed(obj, close_date: Optional[datetime] = None) -> None:
+    """Пометить проект или пожертвование как закрытое."""
+    obj.fully_invested = True
+    obj.close_date = close_date or datetime.now()
+
+
+def invest(source, targets: deque, ledger: Optional[list] = None) -> list:
+    """Распределить свободный остаток source по очереди targets.
+
+    Очередь — deque или любая очередь с итерацией и popleft().
+    Закрытые цели снимаются с начала очереди, частично заполненная
+    остаётся первой. Возвращает список затронутых целей; если передан
+    ledger, в него добавляются тройки (source, цель, сумма).
+    """
+    available = remaining(source)
+    close_date = datetime.now()
+    touched = []
+    while targets and available:
+        target = next(iter(targets))
+        amount = min(remaining(target), available)
+        target.invested_amount = (target.invested_amount or 0) + amount
+        available -= amount
+        touched.append(target)
+        if ledger is not None and amount:
+            ledger.append((source, target, amount))
+        if not remaining(target):
+            mark_closed(target, close_date)
+            targets.popleft()
+    source.invested_amount = source.full_amount - available
+    if touched and not available:
+        mark_closed(source, close_date)
+    return touched
@@ -1,20 +1,32 @@
-from datetime import datetime
-from typing import Type, TypeVar, Union
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional, Type, TypeVar, Union
 
 from sqlalchemy import false, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+from app.core.db import query_stats
+from app.core.metrics import allocation_latency, allocation_rows
+from app.core.tracing import current_span, traced
+from app.crud.investment import investment_crud
 from app.models import CharityProject, Donation
+from app.services.allocation import (
+    OPPOSITE, fifo_order, invest, mark_closed, remaining
+)
+from app.services import window_allocation
+from app.services.open_queue import open_queue
 
 ModelType = TypeVar('ModelType', CharityProject, Donation)
 
 
 async def close(obj: Union[CharityProject, Donation]) -> None:
     """Закрыть проект или пожертвование."""
-    obj.fully_invested = True
-    obj.close_date = datetime.now()
+    mark_closed(obj)
 
 
+@traced
 async def get_open_objects(
     model: Type[ModelType],
     session: AsyncSession,
@@ -25,36 +37,255 @@ async def get_open_objects(
     ).where(
         model.fully_invested == false()
     ).order_by(
-        model.create_date
+        *fifo_order(model)
     )
     open_objs = await session.execute(statement)
 
     return open_objs.scalars().all()
 
 
+@traced
+async def reload_open(
+    objs: list[Union[CharityProject, Donation]],
+    session: AsyncSession,
+) -> list[Union[CharityProject, Donation]]:
+    """Перечитать объекты из БД и оставить только незаполненные.
+
+    Пока задание ждёт в очереди распределения, новый объект может быть
+    заполнен распределением с другой стороны, а в сессии обработчика
+    остаются прочитанные до этого суммы.
+    """
+    model = type(objs[0])
+    await session.execute(
+        select(model).where(
+            model.id.in_([obj.id for obj in objs])
+        ).execution_options(populate_existing=True)
+    )
+    return [obj for obj in objs if remaining(obj)]
+
+
+@traced
+async def invest_streamed(
+    objs: list,
+    session: AsyncSession,
+    target: Optional[Type[ModelType]] = None,
+    ledger: Optional[list] = None,
+) -> list[Union[CharityProject, Donation]]:
+    """Распределить объекты, подгружая открытые строки порциями.
+
+    Порции читаются только пока у объектов остаётся нераспределённая
+    сумма, поэтому число прочитанных строк зависит от числа заполненных,
+    а не от длины очереди. Возвращает затронутые строки.
+    """
+    target = target or OPPOSITE[type(objs[0])]
+    statement = select(
+        target
+    ).where(
+        target.fully_invested == false()
+    ).order_by(
+        *fifo_order(target)
+    ).execution_options(
+        yield_per=settings.allocation_fetch_size
+    )
+    result = await session.stream(statement)
+    partitions = result.scalars().partitions()
+    queue = deque()
+    touched = []
+    try:
+        for obj in objs:
+            while remaining(obj):
+                if not queue:
+                    queue.extend(await partitions.__anext__())
+                touched.extend(invest(obj, queue, ledger))
+    except StopAsyncIteration:
+        pass
+    finally:
+        await result.close()
+    return touched
+
+
+class AllocationWriter:
+    """Единственная задача, последовательно выполняющая распределения.
+
+    Обработчики запросов ставят распределение в очередь и ждут только
+    свой результат, поэтому два распределения не читают одни и те же
+    открытые объекты одновременно.
+    """
+
+    def __init__(self):
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+        self.running: Optional[asyncio.Future] = None
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if (
+            self.task is None or self.task.done() or
+            self.task.get_loop() is not loop
+        ):
+            self.queue = asyncio.Queue()
+            self.task = loop.create_task(self.run(self.queue))
+
+    async def stop(self) -> None:
+        """Выполнить уже принятые задания и остановить задачу."""
+        task, self.task = self.task, None
+        if task is None or task.done():
+            return
+        if task.get_loop() is not asyncio.get_running_loop():
+            # Цикл событий, в котором работала задача, уже завершён.
+            return
+        self.queue.put_nowait(None)
+        await task
+
+    async def run(self, queue: asyncio.Queue) -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            job, future, context = item
+            if future.cancelled():
+                continue
+            self.running = future
+            # Запросы и интервалы задания относятся к обработчику,
+            # который его прислал.
+            for var, value in context.items():
+                var.set(value)
+            try:
+                result = await job()
+            except Exception as error:
+                if not future.cancelled():
+                    future.set_exception(error)
+            else:
+                if not future.cancelled():
+                    future.set_result(result)
+            finally:
+                self.running = None
+
+    async def submit(self, job: Callable[[], Awaitable]):
+        """Поставить задание в очередь и дождаться его результата.
+
+        Задание работает с сессией вызывающего обработчика, поэтому
+        при отмене запроса уже начатое задание дожидается завершения:
+        иначе сессия закрылась бы посреди распределения.
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((
+            job, future, {var: var.get() for var in (query_stats, current_span)}
+        ))
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if self.running is not future:
+                future.cancel()
+                raise
+            while not future.done():
+                try:
+                    await asyncio.shield(future)
+                except asyncio.CancelledError:
+                    pass
+                except Exception:
+                    break
+            raise
+
+
+allocation_writer = AllocationWriter()
+
+
+@traced
 async def donate(
     obj: Union[CharityProject, Donation],
     session: AsyncSession,
 ) -> None:
     """Распределить пожертвования по незавершенным проектам."""
-    target = Donation if isinstance(obj, CharityProject) else CharityProject
-
-    queue_to_distribution = await get_open_objects(target, session)
-    if not queue_to_distribution:
-        return
-
-    available_quantity = obj.full_amount
-    for elem in queue_to_distribution:
-        deficit = elem.full_amount - elem.invested_amount
-        invested_amount = min(deficit, available_quantity)
-        elem.invested_amount += invested_amount
-        obj.invested_amount += invested_amount
-        available_quantity -= invested_amount
-
-        if elem.full_amount == elem.invested_amount:
-            await close(elem)
-
-        if not available_quantity:
-            await close(obj)
-            break
+    await measured(lambda: allocate(obj, session))
+
+
+@traced
+async def allocate(
+    obj: Union[CharityProject, Donation],
+    session: AsyncSession,
+) -> int:
+    """Распределение выбранным в настройках способом.
+
+    Возвращает число заполненных строк другой стороны.
+    """
+    if not await reload_open([obj], session):
+        return 0
+    if settings.allocation_backend == 'memory':
+        return await open_queue.allocate(obj, session)
+    if settings.allocation_backend == 'window':
+        return await window_allocation.allocate(obj, session)
+    ledger = []
+    touched = await invest_streamed([obj], session, ledger=ledger)
+    if not touched:
+        return 0
+    await investment_crud.record(type(obj), ledger, session)
+    await session.commit()
+    return len(touched)
+
+
+@traced
+async def create_and_donate_batch(
+    crud,
+    objs_data: list[dict],
+    session: AsyncSession,
+) -> list[int]:
+    """Вставить объекты одним INSERT и распределить их за один проход.
+
+    Вставка выполняется в том же задании очереди распределения: иначе
+    незафиксированный INSERT держал бы блокировку записи SQLite, пока
+    задание ждёт очереди, и выполняющееся в это время распределение
+    падало бы с database is locked. Возвращает id объектов в порядке
+    objs_data.
+    """
+    ids = []
+
+    async def job() -> int:
+        try:
+            objs = await crud.create_multi(objs_data, session)
+            ids.extend(obj.id for obj in objs)
+            touched = await allocate_batch(objs, session)
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+        return touched
+
+    await measured(job)
+    return ids
+
+
+async def measured(job: Callable[[], Awaitable[int]]) -> None:
+    """Выполнить распределение и записать его длительность и охват."""
+    started = time.perf_counter()
+    if settings.allocation_single_writer:
+        touched = await allocation_writer.submit(job)
+    else:
+        touched = await job()
+    backend = settings.allocation_backend
+    allocation_latency.observe(time.perf_counter() - started, backend)
+    allocation_rows.observe(touched, backend)
+
+
+@traced
+async def allocate_batch(
+    objs: list[Union[CharityProject, Donation]],
+    session: AsyncSession,
+) -> int:
+    """Пакетное распределение, объекты обрабатываются в порядке списка.
+
+    Для способа window пакет распределяется общим циклом по объектам:
+    отдельный оконный запрос на каждый объект пакета дороже одного
+    чтения очереди.
+    """
+    objs = await reload_open(objs, session)
+    if not objs:
+        return 0
+    if settings.allocation_backend == 'memory':
+        return await open_queue.allocate_many(objs, session)
+    ledger = []
+    touched = await invest_streamed(objs, session, ledger=ledger)
+    await investment_crud.record(type(objs[0]), ledger, session)
     await session.commit()
+    return len(set(touched))
@@ -0,0 +1,88 @@
+import asyncio
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal
+from app.crud.donation import donation_crud
+from app.models import User
+from app.schemas.donation import DonationCreate, DonationDBBase
+from app.services.charity_services import create_and_donate_batch
+
+
+class DonationBatcher:
+    """Собирает пожертвования, пришедшие в коротком окне, в один пакет.
+
+    Пакет вставляется одним многострочным INSERT и распределяется за один
+    проход в порядке поступления одним заданием очереди распределения,
+    с одним commit в отдельной сессии, не зависящей от запросов, чьи
+    пожертвования в него попали.
+    """
+
+    def __init__(self, session_factory: sessionmaker = AsyncSessionLocal):
+        self.session_factory = session_factory
+        self.pending: list = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.tasks: set[asyncio.Task] = set()
+
+    async def submit(
+        self,
+        donation: DonationCreate,
+        user: User,
+    ) -> DonationDBBase:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((donation, user, future))
+        if len(self.pending) >= settings.donation_batch_size:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(
+                settings.donation_batch_window_ms / 1000, self.flush
+            )
+        return await asyncio.shield(future)
+
+    def flush(self) -> None:
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self.save(batch))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def save(self, batch: list) -> None:
+        futures = [future for *_, future in batch]
+        try:
+            async with self.session_factory() as session:
+                results = await self.insert_and_donate(batch, session)
+        except Exception as error:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for future, result in zip(futures, results):
+            if not future.done():
+                future.set_result(result)
+
+    @staticmethod
+    async def insert_and_donate(
+        batch: list,
+        session: AsyncSession,
+    ) -> list[DonationDBBase]:
+        ids = await create_and_donate_batch(donation_crud, [
+            dict(
+                donation.dict(),
+                user_id=user.id,
+                create_date=datetime.now(),
+            ) for donation, user, _ in batch
+        ], session)
+        objs = await donation_crud.get_by_ids(ids, session)
+        return [DonationDBBase.from_orm(obj) for obj in objs]
+
+
+donation_batcher = DonationBatcher()
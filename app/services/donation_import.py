@@ -0,0 +1,179 @@
+import codecs
+import csv
+import json
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.crud.donation import donation_crud
+from app.crud.investment import investment_crud
+from app.models import CharityProject, Donation
+from app.schemas.donation import DonationImport
+from app.services.charity_services import allocation_writer, invest_streamed
+from app.services.open_queue import open_queue
+
+
+class ImportedDonation:
+    """Строка импорта, распределяемая до вставки в БД."""
+    __slots__ = (
+        'id', 'full_amount', 'invested_amount', 'fully_invested',
+        'close_date', 'row',
+    )
+
+    def __init__(self, row: dict):
+        self.id = None
+        self.row = row
+        self.full_amount = row['full_amount']
+        self.invested_amount = 0
+        self.fully_invested = False
+        self.close_date = None
+
+    def values(self) -> dict:
+        return dict(
+            self.row,
+            invested_amount=self.invested_amount,
+            fully_invested=self.fully_invested,
+            close_date=self.close_date,
+        )
+
+
+async def read_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Разбить поток байтов на строки, не накапливая его целиком."""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    tail = ''
+    async for chunk in stream:
+        *lines, tail = (tail + decoder.decode(chunk)).split('\n')
+        for line in lines:
+            yield line
+    tail += decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+async def read_records(
+    stream: AsyncIterator[bytes],
+    content_type: str,
+) -> AsyncIterator[tuple[int, dict]]:
+    """Записи NDJSON или CSV (первая строка — заголовок) с номерами строк."""
+    is_csv = 'csv' in content_type
+    header = None
+    line_number = 0
+    async for line in read_lines(stream):
+        line_number += 1
+        line = line.rstrip('\r')
+        if not line.strip():
+            continue
+        if not is_csv:
+            try:
+                yield line_number, json.loads(line)
+            except ValueError:
+                raise import_error(line_number, 'некорректный JSON')
+            continue
+        values = next(csv.reader([line]))
+        if header is None:
+            header = values
+            continue
+        yield line_number, {
+            key: value for key, value in zip(header, values) if value != ''
+        }
+
+
+def import_error(line_number: int, reason: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        detail=f'Строка {line_number}: {reason}',
+    )
+
+
+async def save_chunk(chunk: list[ImportedDonation], session: AsyncSession):
+    """Распределить пачку по открытым проектам и вставить её одним INSERT."""
+    if settings.allocation_backend == 'memory':
+        return await save_chunk_resident(chunk, session)
+    ledger = []
+    touched = await invest_streamed(chunk, session, CharityProject, ledger)
+    allocated = sum(donation.invested_amount for donation in chunk)
+    closed = sum(project.fully_invested for project in set(touched))
+    ids = await donation_crud.insert_multi(
+        [donation.values() for donation in chunk], session
+    )
+    for donation, donation_id in zip(chunk, ids):
+        donation.id = donation_id
+    await investment_crud.record(Donation, ledger, session)
+    await session.commit()
+    return allocated, closed
+
+
+async def save_chunk_resident(
+    chunk: list[ImportedDonation],
+    session: AsyncSession,
+):
+    """Вставить пачку и распределить её по резидентной очереди.
+
+    Так очередь совпадает с БД после каждой пачки, и пожертвования,
+    распределяемые между пачками, видят суммы, внесённые импортом.
+    """
+    if not open_queue.ready:
+        await open_queue.rebuild(session)
+    open_projects = (await open_queue.depth(session))[CharityProject]
+    objs = await donation_crud.create_multi(
+        [donation.values() for donation in chunk], session
+    )
+    ids = [obj.id for obj in objs]
+    await open_queue.allocate_many(objs, session)
+    # После commit объекты пачки устарели, сумму проще прочитать из БД.
+    allocated = await session.scalar(
+        select(func.sum(Donation.invested_amount)).where(Donation.id.in_(ids))
+    )
+    closed = open_projects - (await open_queue.depth(session))[CharityProject]
+    return allocated, closed
+
+
+async def import_donations(
+    stream: AsyncIterator[bytes],
+    content_type: str,
+    session: AsyncSession,
+    chunk_size: Optional[int] = None,
+) -> dict:
+    """Потоково импортировать пожертвования пачками фиксированного размера.
+
+    Каждая пачка распределяется и фиксируется сразу после чтения, поэтому
+    в памяти держится не больше одной пачки. При ошибке в строке уже
+    сохранённые пачки остаются в БД.
+    """
+    chunk_size = chunk_size or settings.donation_import_chunk_size
+    summary = dict(imported=0, allocated=0, projects_closed=0)
+    chunk = []
+    create_date = datetime.now()
+
+    async def flush():
+        if settings.allocation_single_writer:
+            allocated, closed = await allocation_writer.submit(
+                lambda: save_chunk(chunk, session)
+            )
+        else:
+            allocated, closed = await save_chunk(chunk, session)
+        summary['imported'] += len(chunk)
+        summary['allocated'] += allocated
+        summary['projects_closed'] += closed
+        chunk.clear()
+
+    async for line_number, record in read_records(stream, content_type):
+        try:
+            donation = DonationImport.parse_obj(record)
+        except ValidationError as error:
+            raise import_error(line_number, str(error))
+        chunk.append(ImportedDonation(
+            dict(donation.dict(), create_date=(
+                donation.create_date or create_date
+            ))
+        ))
+        if len(chunk) >= chunk_size:
+            await flush()
+    if chunk:
+        await flush()
+    return summary
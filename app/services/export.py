@@ -0,0 +1,142 @@
+"""Потоковая выгрузка таблиц целиком."""
+import json
+from datetime import datetime
+from typing import AsyncIterator, Literal, Optional, Type
+
+import orjson
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import fragment_cache
+from app.core.config import settings
+from app.core.metrics import fragment_cache_rows
+
+ExportFormat = Literal['ndjson', 'json']
+MEDIA_TYPES = {'ndjson': 'application/x-ndjson', 'json': 'application/json'}
+
+
+def encode_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} не сериализуется в JSON')
+
+
+def serialize_row(keys: list[str], row) -> dict:
+    """Строка выборки как словарь без пустых значений."""
+    return {key: value for key, value in zip(keys, row) if value is not None}
+
+
+def encode_rows(
+    keys: list[str],
+    rows: list,
+    table: Optional[str] = None,
+) -> bytes:
+    """JSON-массив строк выборки; строки таблицы table, не изменившиеся
+    с прошлого раза, берутся готовыми из кэша фрагментов."""
+    if table is None or not fragment_cache.max_size:
+        return orjson.dumps([serialize_row(keys, row) for row in rows])
+    fields = tuple(keys)
+    # Порядок полей схемы, поэтому id не обязательно первый.
+    id_index = keys.index('id')
+    fragments = []
+    hits = 0
+    for row in rows:
+        values = tuple(row)
+        key = (table, fields, values[id_index])
+        fragment = fragment_cache.get(key, values)
+        if fragment is None:
+            fragment = fragment_cache.put(
+                key, values, orjson.dumps(serialize_row(keys, values))
+            )
+        else:
+            hits += 1
+        fragments.append(fragment)
+    fragment_cache_rows.inc('hit', amount=hits)
+    fragment_cache_rows.inc('miss', amount=len(fragments) - hits)
+    return b'[' + b','.join(fragments) + b']'
+
+
+def rows_response(
+    keys: list[str],
+    rows: list,
+    headers: Optional[dict] = None,
+    table: Optional[str] = None,
+) -> Response:
+    """Ответ со списком строк выборки столбцов, без ORM и pydantic.
+
+    orjson кодирует даты в тот же ISO-формат, что и jsonable_encoder,
+    и так же компактно, как JSONResponse, поэтому тело ответа совпадает
+    с ответом через response_model.
+    """
+    return Response(
+        encode_rows(keys, rows, table),
+        media_type='application/json',
+        headers=headers,
+    )
+
+
+def model_response(
+    schema: Type[BaseModel],
+    items: list,
+    headers: Optional[dict] = None,
+) -> Response:
+    """Ответ со списком ORM-объектов, собранный так же, как его собирает
+    response_model с response_model_exclude_none."""
+    return JSONResponse(
+        jsonable_encoder(
+            [schema.from_orm(item) for item in items], exclude_none=True
+        ),
+        headers=headers,
+    )
+
+
+async def export_rows(
+    model,
+    schema: Type[BaseModel],
+    session: AsyncSession,
+    export_format: ExportFormat = 'ndjson',
+    chunk_size: Optional[int] = None,
+) -> AsyncIterator[bytes]:
+    """Строки таблицы с полями схемы порциями через серверный курсор.
+
+    Каждая порция кодируется и отдаётся сразу после чтения, без ORM
+    и проверки pydantic, поэтому память не зависит от размера таблицы.
+    Пустые значения опускаются, как в списочных эндпоинтах.
+    """
+    keys = list(schema.__fields__)
+    result = await session.stream(
+        select(
+            *(model.__table__.c[key] for key in keys)
+        ).order_by(
+            model.id
+        ).execution_options(
+            yield_per=chunk_size or settings.export_chunk_size
+        )
+    )
+    separator = '\n' if export_format == 'ndjson' else ','
+    started = False
+    if export_format == 'json':
+        yield b'['
+    try:
+        async for partition in result.partitions():
+            chunk = separator.join(
+                json.dumps(
+                    serialize_row(keys, row),
+                    default=encode_value,
+                    ensure_ascii=False,
+                ) for row in partition
+            )
+            if export_format == 'ndjson':
+                chunk += '\n'
+            elif started:
+                chunk = ',' + chunk
+            started = True
+            yield chunk.encode()
+    finally:
+        await result.close()
+    if export_format == 'json':
+        yield b']'
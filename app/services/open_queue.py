@@ -0,0 +1,218 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Union
+
+from sqlalchemy import bindparam, false, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.investment import investment_crud
+from app.models import CharityProject, Donation
+from app.services.allocation import OPPOSITE, fifo_order, invest
+
+
+class OpenEntry:
+    """Незакрытый проект или пожертвование в резидентной очереди."""
+    __slots__ = (
+        'id', 'full_amount', 'invested_amount', 'create_date',
+        'fully_invested', 'close_date',
+    )
+
+    def __init__(
+        self,
+        id: int,
+        full_amount: int,
+        invested_amount: Optional[int],
+        create_date: Optional[datetime],
+    ):
+        self.id = id
+        self.full_amount = full_amount
+        self.invested_amount = invested_amount or 0
+        self.create_date = create_date
+        self.fully_invested = False
+        self.close_date = None
+
+    @classmethod
+    def from_obj(cls, obj: Union[CharityProject, Donation]) -> 'OpenEntry':
+        return cls(
+            obj.id, obj.full_amount, obj.invested_amount, obj.create_date
+        )
+
+
+def fifo_key(entry: Optional[OpenEntry]) -> tuple:
+    """Место записи в порядке fifo_order, пустая очередь — самое раннее."""
+    if entry is None:
+        return (datetime.min, 0)
+    return (entry.create_date or datetime.min, entry.id)
+
+
+class EntryQueue:
+    """FIFO-очередь записей с доступом по id за O(1)."""
+
+    def __init__(self, entries=()):
+        self.entries = OrderedDict((entry.id, entry) for entry in entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries.values())
+
+    def append(self, entry: OpenEntry) -> None:
+        self.entries[entry.id] = entry
+
+    def popleft(self) -> OpenEntry:
+        return self.entries.popitem(last=False)[1]
+
+    def last(self) -> Optional[OpenEntry]:
+        return next(reversed(self.entries.values()), None)
+
+    def get(self, entry_id: int) -> Optional[OpenEntry]:
+        return self.entries.get(entry_id)
+
+    def remove(self, entry_id: int) -> None:
+        self.entries.pop(entry_id, None)
+
+
+class OpenQueue:
+    """Резидентные FIFO-очереди незакрытых проектов и пожертвований.
+
+    Очереди строятся из БД один раз и дальше меняются только
+    инкрементально, поэтому распределение затрагивает лишь те строки,
+    которые оно заполняет. Рассчитано на один процесс приложения.
+    """
+
+    def __init__(self):
+        self.queues: dict[type, EntryQueue] = {}
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.queues)
+
+    async def rebuild(self, session: AsyncSession) -> None:
+        """Заново загрузить очереди из БД."""
+        queues = {}
+        for model in OPPOSITE:
+            rows = await session.execute(
+                select(
+                    model.id,
+                    model.full_amount,
+                    model.invested_amount,
+                    model.create_date,
+                ).where(
+                    model.fully_invested == false()
+                ).order_by(
+                    *fifo_order(model)
+                )
+            )
+            queues[model] = EntryQueue(OpenEntry(*row) for row in rows)
+        self.queues = queues
+
+    async def depth(self, session: AsyncSession) -> dict[type, int]:
+        """Число открытых объектов: из очередей или, пока их нет, из БД."""
+        if self.ready:
+            return {model: len(queue) for model, queue in self.queues.items()}
+        return {
+            model: await session.scalar(
+                select(func.count()).where(model.fully_invested == false())
+            ) for model in OPPOSITE
+        }
+
+    def invalidate(self) -> None:
+        """Сбросить очереди, они будут перестроены при следующем вызове."""
+        self.queues = {}
+
+    def discard(self, obj: Union[CharityProject, Donation]) -> None:
+        """Убрать объект из очереди, например после удаления."""
+        if self.ready:
+            self.queues[type(obj)].remove(obj.id)
+
+    def sync(self, obj: Union[CharityProject, Donation]) -> None:
+        """Перенести в очередь изменения объекта, сделанные вне donate()."""
+        if not self.ready:
+            return
+        if obj.fully_invested:
+            self.discard(obj)
+            return
+        entry = self.queues[type(obj)].get(obj.id)
+        if entry is not None:
+            entry.full_amount = obj.full_amount
+            entry.invested_amount = obj.invested_amount
+
+    async def allocate(
+        self,
+        obj: Union[CharityProject, Donation],
+        session: AsyncSession,
+    ) -> int:
+        """Распределить новый объект по резидентной очереди и сохранить."""
+        return await self.allocate_many([obj], session)
+
+    async def allocate_many(
+        self,
+        objs: list[Union[CharityProject, Donation]],
+        session: AsyncSession,
+    ) -> int:
+        """Распределить новые объекты по очереди за один проход.
+
+        Возвращает число заполненных строк очереди.
+        """
+        if not self.ready:
+            await self.rebuild(session)
+        touched = {}
+        ledger = []
+        out_of_order = False
+        for obj in objs:
+            # Объект, вставленный до последнего перестроения, уже лежит
+            # в очереди; удаление по id стоит O(1).
+            self.discard(obj)
+            target = OPPOSITE[type(obj)]
+            source = OpenEntry.from_obj(obj)
+            for entry in invest(source, self.queues[target], ledger):
+                touched[target, entry.id] = entry
+            if not source.fully_invested:
+                queue = self.queues[type(obj)]
+                out_of_order |= fifo_key(queue.last()) > fifo_key(source)
+                queue.append(source)
+            obj.invested_amount = source.invested_amount
+            obj.fully_invested = source.fully_invested
+            obj.close_date = source.close_date
+        try:
+            for model in OPPOSITE:
+                entries = [
+                    entry for (target, _), entry in touched.items()
+                    if target is model
+                ]
+                if entries:
+                    await self.save(model, entries, session)
+            await investment_crud.record(type(objs[0]), ledger, session)
+            await session.commit()
+        except Exception:
+            self.invalidate()
+            raise
+        if out_of_order:
+            # Объект с более ранней create_date (например, из импорта)
+            # встал бы в конец очереди; порядок восстановит перестроение.
+            self.invalidate()
+        return len(touched)
+
+    @staticmethod
+    async def save(model, entries: list, session: AsyncSession) -> None:
+        """Записать затронутые строки одним executemany UPDATE."""
+        table = model.__table__
+        statement = update(table).where(
+            table.c.id == bindparam('entry_id')
+        ).values(
+            invested_amount=bindparam('entry_invested_amount'),
+            fully_invested=bindparam('entry_fully_invested'),
+            close_date=bindparam('entry_close_date'),
+        )
+        await session.execute(statement, [
+            dict(
+                entry_id=entry.id,
+                entry_invested_amount=entry.invested_amount,
+                entry_fully_invested=entry.fully_invested,
+                entry_close_date=entry.close_date,
+            ) for entry in entries
+        ])
+
+
+open_queue = OpenQueue()
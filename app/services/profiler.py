@@ -0,0 +1,177 @@
+"""Профилирование выбранного маршрута в работающем процессе."""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Optional
+
+from starlette.routing import Match
+
+STATS_LIMIT = 50
+MEMORY_LIMIT = 20
+SAMPLE_INTERVAL = 0.005
+
+
+class Sampler(threading.Thread):
+    """Снимает стек потока цикла событий, пока идут профилируемые запросы."""
+
+    def __init__(self, thread_id: int):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.stacks = Counter()
+        self.active = threading.Event()
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.wait(SAMPLE_INTERVAL):
+            if not self.active.is_set():
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self.collapse(frame)] += 1
+
+    @staticmethod
+    def collapse(frame) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(
+                f'{code.co_name} ({os.path.basename(code.co_filename)}:'
+                f'{frame.f_lineno})'
+            )
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def output(self) -> str:
+        return '\n'.join(
+            f'{stack} {count}' for stack, count in self.stacks.most_common()
+        )
+
+
+class Profiler:
+    """Сеанс профилирования следующих запросов к одному маршруту.
+
+    Запросы к маршруту профилируются, пока не наберётся заданное число
+    запросов или не истечёт время. Профиль cProfile и сэмплер охватывают
+    весь поток цикла событий, поэтому в отчёт попадают и корутины
+    одновременных запросов к другим маршрутам.
+    """
+
+    def __init__(self):
+        self.settings = None
+        self.routes = []
+        self.profile: Optional[cProfile.Profile] = None
+        self.sampler: Optional[Sampler] = None
+        self.deadline: Optional[float] = None
+        self.in_flight = 0
+        self.profiled_requests = 0
+        self.running = False
+        self.started_tracemalloc = False
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+        self.output: Optional[str] = None
+        self.memory: list[str] = []
+
+    def start(self, settings, routes: list) -> None:
+        self.settings = settings
+        self.routes = routes
+        self.profiled_requests = 0
+        self.in_flight = 0
+        self.output = None
+        self.memory = []
+        self.deadline = (
+            time.monotonic() + settings.seconds if settings.seconds else None
+        )
+        if settings.mode == 'cprofile':
+            self.profile = cProfile.Profile()
+        else:
+            self.sampler = Sampler(threading.get_ident())
+            self.sampler.start()
+        self.started_tracemalloc = not tracemalloc.is_tracing()
+        if self.started_tracemalloc:
+            tracemalloc.start()
+        self.snapshot = tracemalloc.take_snapshot()
+        self.running = True
+
+    def matches(self, scope: dict) -> bool:
+        if not self.running or self.expired():
+            return False
+        return any(
+            route.matches(scope)[0] == Match.FULL for route in self.routes
+        )
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() > self.deadline
+
+    def begin(self, scope: dict) -> bool:
+        """Начать профилирование запроса, если он к выбранному маршруту."""
+        if not self.matches(scope):
+            return False
+        if not self.in_flight:
+            if self.profile:
+                self.profile.enable()
+            else:
+                self.sampler.active.set()
+        self.in_flight += 1
+        return True
+
+    def end(self) -> None:
+        self.in_flight -= 1
+        self.profiled_requests += 1
+        if not self.in_flight:
+            if self.profile:
+                self.profile.disable()
+            else:
+                self.sampler.active.clear()
+        limit = self.settings.requests
+        if (
+            not self.in_flight and
+            (limit and self.profiled_requests >= limit or self.expired())
+        ):
+            self.finish()
+
+    def finish(self) -> None:
+        """Остановить сеанс и собрать отчёт."""
+        if not self.running:
+            return
+        self.running = False
+        if self.profile:
+            self.profile.disable()
+            stream = io.StringIO()
+            stats = pstats.Stats(self.profile, stream=stream)
+            stats.sort_stats('cumulative').print_stats(STATS_LIMIT)
+            self.output = stream.getvalue()
+            self.profile = None
+        else:
+            self.sampler.stopped.set()
+            self.sampler.join()
+            self.output = self.sampler.output()
+            self.sampler = None
+        self.memory = [
+            str(stat) for stat in tracemalloc.take_snapshot().compare_to(
+                self.snapshot, 'lineno'
+            )[:MEMORY_LIMIT]
+        ]
+        self.snapshot = None
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+
+    def report(self) -> dict:
+        if self.running and not self.in_flight and self.expired():
+            self.finish()
+        return dict(
+            route=self.settings.route,
+            method=self.settings.method,
+            mode=self.settings.mode,
+            running=self.running,
+            profiled_requests=self.profiled_requests,
+            output=self.output,
+            memory=self.memory,
+        )
+
+
+profiler = Profiler()
@@ -0,0 +1,217 @@
+"""Пересчёт распределения всех проектов и пожертвований с нуля.
+
+Запуск: python -m app.services.replay [--verify] [--chunk-size N]
+
+При ALLOCATION_BACKEND=memory работающее приложение держит очереди
+в памяти и не видит пересчёта из другого процесса: после записи его
+нужно перезапустить, иначе распределение вернёт в БД старые суммы.
+"""
+import argparse
+import asyncio
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal
+from app.models import CharityProject, Donation
+from app.services.allocation import fifo_order
+from app.services.open_queue import open_queue
+
+CHUNK_SIZE = 10000
+
+
+class Ledger:
+    """Столбцы одной таблицы в порядке очереди."""
+
+    def __init__(self, rows: list):
+        (
+            self.ids, self.full_amount, self.invested_amount,
+            self.fully_invested, self.create_date, self.close_date,
+        ) = (
+            np.array(column, dtype=dtype) for column, dtype in zip(
+                zip(*rows) if rows else ([],) * 6,
+                ('int64', 'int64', 'int64', 'bool', 'datetime64[us]', 'O'),
+            )
+        )
+
+
+async def load(
+    model,
+    session: AsyncSession,
+    chunk_size: int = CHUNK_SIZE,
+) -> Ledger:
+    """Прочитать таблицу потоком порциями в порядке очереди."""
+    result = await session.stream(
+        select(
+            model.id,
+            model.full_amount,
+            model.invested_amount,
+            model.fully_invested,
+            model.create_date,
+            model.close_date,
+        ).order_by(
+            *fifo_order(model)
+        ).execution_options(yield_per=chunk_size)
+    )
+    rows = []
+    async for partition in result.partitions():
+        rows.extend(
+            (id, full, invested or 0, bool(closed), created, close_date)
+            for id, full, invested, closed, created, close_date in partition
+        )
+    return Ledger(rows)
+
+
+def match(
+    projects: Ledger,
+    donations: Ledger,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Полное FIFO-сопоставление нарастающими итогами.
+
+    k-й рубль пожертвований всегда уходит в k-й рубль потребности
+    проектов, поэтому вложенная сумма строки — это пересечение её
+    отрезка нарастающего итога с общим объёмом сопоставленных денег.
+    Дата закрытия — дата создания более поздней из двух строк, на
+    которых закончилось заполнение (поиск через searchsorted).
+    Возвращает суммы и даты закрытия для проектов и пожертвований.
+    """
+    project_total = np.cumsum(projects.full_amount)
+    donation_total = np.cumsum(donations.full_amount)
+    matched = min(
+        project_total[-1] if len(project_total) else 0,
+        donation_total[-1] if len(donation_total) else 0,
+    )
+    results = []
+    for own, total, other, other_total in (
+        (projects, project_total, donations, donation_total),
+        (donations, donation_total, projects, project_total),
+    ):
+        invested = (
+            np.minimum(total, matched) -
+            np.minimum(total - own.full_amount, matched)
+        )
+        closed = invested == own.full_amount
+        close_date = np.full(len(total), np.datetime64('NaT'), 'datetime64[us]')
+        if closed.any():
+            counterpart = np.searchsorted(other_total, total[closed])
+            close_date[closed] = np.maximum(
+                own.create_date[closed], other.create_date[counterpart]
+            )
+        results.extend((invested, close_date))
+    return tuple(results)
+
+
+def differences(ledger: Ledger, invested: np.ndarray) -> np.ndarray:
+    """Индексы строк, у которых сумма или флаг закрытия расходятся."""
+    closed = invested == ledger.full_amount
+    return np.flatnonzero(
+        (ledger.invested_amount != invested) |
+        (ledger.fully_invested != closed)
+    )
+
+
+async def write(
+    model,
+    ledger: Ledger,
+    invested: np.ndarray,
+    close_date: np.ndarray,
+    changed: np.ndarray,
+    session: AsyncSession,
+    chunk_size: int = CHUNK_SIZE,
+) -> None:
+    """Записать изменившиеся строки порциями executemany UPDATE."""
+    table = model.__table__
+    statement = update(table).where(
+        table.c.id == bindparam('row_id')
+    ).values(
+        invested_amount=bindparam('row_invested_amount'),
+        fully_invested=bindparam('row_fully_invested'),
+        close_date=bindparam('row_close_date'),
+    )
+    for start in range(0, len(changed), chunk_size):
+        params = []
+        for index in changed[start:start + chunk_size]:
+            closed = bool(invested[index] == ledger.full_amount[index])
+            params.append(dict(
+                row_id=int(ledger.ids[index]),
+                row_invested_amount=int(invested[index]),
+                row_fully_invested=closed,
+                row_close_date=(
+                    (ledger.close_date[index] or close_date[index].item())
+                    if closed else None
+                ),
+            ))
+        await session.execute(statement, params)
+        await session.commit()
+
+
+async def replay(
+    session: AsyncSession,
+    verify: bool = False,
+    chunk_size: int = CHUNK_SIZE,
+) -> dict:
+    """Пересчитать распределение и вернуть число расхождений по таблицам.
+
+    В режиме verify база не меняется.
+    """
+    projects = await load(CharityProject, session, chunk_size)
+    donations = await load(Donation, session, chunk_size)
+    project_invested, project_close, donation_invested, donation_close = (
+        match(projects, donations)
+    )
+    report = {}
+    for model, ledger, invested, close_date in (
+        (CharityProject, projects, project_invested, project_close),
+        (Donation, donations, donation_invested, donation_close),
+    ):
+        changed = differences(ledger, invested)
+        report[model.__tablename__] = [
+            dict(
+                id=int(ledger.ids[index]),
+                invested_amount=int(ledger.invested_amount[index]),
+                expected_invested_amount=int(invested[index]),
+            ) for index in changed
+        ]
+        if not verify:
+            await write(
+                model, ledger, invested, close_date, changed, session,
+                chunk_size,
+            )
+    if not verify:
+        # Сбрасывает очереди только этого процесса, см. docstring модуля.
+        open_queue.invalidate()
+    return report
+
+
+async def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--verify', action='store_true',
+        help='только показать расхождения, не изменяя БД',
+    )
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+    started = datetime.now()
+    async with AsyncSessionLocal() as session:
+        report = await replay(session, args.verify, args.chunk_size)
+    for table, rows in report.items():
+        print(f'{table}: расхождений {len(rows)}')
+        for row in rows:
+            print(
+                f'  id={row["id"]}: {row["invested_amount"]} -> '
+                f'{row["expected_invested_amount"]}'
+            )
+    print(f'Готово за {datetime.now() - started}')
+    if not args.verify and settings.allocation_backend == 'memory':
+        print(
+            'ALLOCATION_BACKEND=memory: перезапустите приложение, '
+            'чтобы оно перестроило очереди из БД.'
+        )
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+from collections import deque
+from typing import AsyncIterator, Iterable, Type, Union
+
+from sqlalchemy import false, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import CharityProject, Donation
+from app.services.allocation import OPPOSITE, fifo_order, invest, remaining
+from app.services.open_queue import OpenEntry, open_queue
+
+
+async def stream_open_entries(
+    model: Type[Union[CharityProject, Donation]],
+    session: AsyncSession,
+) -> AsyncIterator[OpenEntry]:
+    """Открытые строки из БД только нужными столбцами, порциями."""
+    result = await session.stream(
+        select(
+            model.id,
+            model.full_amount,
+            model.invested_amount,
+            model.create_date,
+        ).where(
+            model.fully_invested == false()
+        ).order_by(
+            *fifo_order(model)
+        ).execution_options(yield_per=settings.allocation_fetch_size)
+    )
+    try:
+        async for row in result:
+            yield OpenEntry(*row)
+    finally:
+        await result.close()
+
+
+def take_resident(entries: Iterable[OpenEntry], amount: int) -> deque:
+    """Копии первых записей резидентной очереди, покрывающих amount."""
+    snapshot = deque()
+    for entry in entries:
+        if amount <= 0:
+            break
+        snapshot.append(OpenEntry(
+            entry.id, entry.full_amount, entry.invested_amount,
+            entry.create_date,
+        ))
+        amount -= remaining(entry)
+    return snapshot
+
+
+async def simulate(
+    model: Type[Union[CharityProject, Donation]],
+    full_amount: int,
+    session: AsyncSession,
+) -> dict:
+    """Рассчитать распределение нового объекта, ничего не записывая.
+
+    Используется та же арифметика, что и в donate(), над копией начала
+    очереди: из резидентной очереди, если она построена, иначе из БД
+    до тех пор, пока сумма не будет покрыта.
+    """
+    target = OPPOSITE[model]
+    if open_queue.ready:
+        snapshot = take_resident(open_queue.queues[target], full_amount)
+    else:
+        snapshot = deque()
+        covered = 0
+        async for entry in stream_open_entries(target, session):
+            snapshot.append(entry)
+            covered += remaining(entry)
+            if covered >= full_amount:
+                break
+    source = OpenEntry(None, full_amount, 0, None)
+    taken = {}
+    ledger = []
+    invest(source, snapshot, ledger)
+    for _, entry, amount in ledger:
+        taken[entry.id] = dict(
+            id=entry.id,
+            amount=amount,
+            fully_invested=entry.fully_invested,
+        )
+    return dict(
+        invested_amount=source.invested_amount,
+        fully_invested=source.fully_invested,
+        used=list(taken.values()),
+    )
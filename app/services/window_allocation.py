@@ -0,0 +1,83 @@
+from datetime import datetime
+from typing import Union
+
+from sqlalchemy import false, func, select, true, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.investment import investment_crud
+from app.models import CharityProject, Donation
+from app.services.allocation import OPPOSITE, fifo_order, mark_closed
+
+
+def fill_prefix(model, amount: int):
+    """Открытые строки, которые заполнит сумма amount, в порядке FIFO.
+
+    Нарастающий итог свободных остатков считается оконной функцией,
+    в выборку попадают строки, до которых сумма amount ещё доходит.
+    """
+    rest = model.full_amount - func.coalesce(model.invested_amount, 0)
+    open_rows = select(
+        model.id,
+        rest.label('rest'),
+        func.sum(rest).over(order_by=fifo_order(model)).label('cumulative'),
+    ).where(
+        model.fully_invested == false()
+    ).subquery()
+    return select(
+        open_rows.c.id, open_rows.c.rest, open_rows.c.cumulative
+    ).where(
+        open_rows.c.cumulative - open_rows.c.rest < amount
+    ).order_by(
+        open_rows.c.cumulative, open_rows.c.id
+    )
+
+
+async def allocate(
+    obj: Union[CharityProject, Donation],
+    session: AsyncSession,
+) -> int:
+    """Распределить объект по открытым строкам постоянным числом запросов.
+
+    Возвращает число заполненных строк.
+    """
+    target = OPPOSITE[type(obj)]
+    amount = obj.full_amount - (obj.invested_amount or 0)
+    prefix = (await session.execute(fill_prefix(target, amount))).all()
+    if not prefix:
+        return 0
+
+    close_date = datetime.now()
+    last = prefix[-1]
+    closed_ids = [row.id for row in prefix if row.cumulative <= amount]
+    if closed_ids:
+        await session.execute(
+            update(target).where(
+                target.id.in_(closed_ids)
+            ).values(
+                invested_amount=target.full_amount,
+                fully_invested=true(),
+                close_date=close_date,
+            ).execution_options(synchronize_session=False)
+        )
+    if last.cumulative > amount:
+        await session.execute(
+            update(target).where(
+                target.id == last.id
+            ).values(
+                invested_amount=(
+                    func.coalesce(target.invested_amount, 0) +
+                    last.rest - (last.cumulative - amount)
+                ),
+            ).execution_options(synchronize_session=False)
+        )
+    ledger = [
+        (obj, row, min(row.rest, amount - (row.cumulative - row.rest)))
+        for row in prefix
+    ]
+    await investment_crud.record(type(obj), ledger, session)
+    invested = min(amount, last.cumulative)
+    obj.invested_amount = (obj.invested_amount or 0) + invested
+    if invested == amount:
+        mark_closed(obj, close_date)
+    await session.commit()
+    return len(prefix)
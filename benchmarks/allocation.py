@@ -0,0 +1,216 @@
+"""Бенчмарк горячего пути распределения.
+
+Запуск:
+    python -m benchmarks.allocation --sizes 100 10000 --output run.json
+    python -m benchmarks.allocation --compare run.json --threshold 0.2
+
+Для каждого размера очереди база SQLite заполняется синтетическими
+открытыми проектами и пожертвованиями, после чего измеряются задержка,
+пропускная способность и пиковая память donate(), CRUDBase.create,
+get_multi и списочных эндпоинтов. Результаты сохраняются в JSON;
+при сравнении с прошлым запуском регрессии выше порога дают код 1.
+"""
+import argparse
+import asyncio
+import json
+import math
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.db import Base, get_async_session
+from app.crud.donation import donation_crud
+from app.main import app
+from app.models import CharityProject, Donation
+from app.schemas.donation import DonationCreate
+from app.services.charity_services import allocation_writer, donate
+from app.services.open_queue import open_queue
+
+SIZES = (100, 1000, 10000)
+BACKENDS = ('orm', 'memory', 'window')
+REPEAT = 50
+SEED_CHUNK = 10000
+
+
+async def seed(session: AsyncSession, size: int) -> None:
+    """Открытые проекты с большой потребностью и закрытые пожертвования."""
+    start = datetime(2020, 1, 1)
+    for model, rows in (
+        (CharityProject, lambda number: dict(
+            name=f'Project {number}', description='Benchmark',
+            full_amount=10 ** 9, invested_amount=0, fully_invested=False,
+            create_date=start + timedelta(seconds=number),
+        )),
+        (Donation, lambda number: dict(
+            full_amount=100, invested_amount=100, fully_invested=True,
+            create_date=start + timedelta(seconds=number),
+            close_date=start + timedelta(seconds=number),
+        )),
+    ):
+        for offset in range(0, size, SEED_CHUNK):
+            await session.execute(insert(model), [
+                rows(number)
+                for number in range(offset, min(size, offset + SEED_CHUNK))
+            ])
+    await session.commit()
+
+
+async def measure(
+    job: Callable[[], Awaitable],
+    repeat: int = REPEAT,
+) -> dict:
+    """Задержка (мс), пропускная способность (оп/с) и пик памяти (КБ)."""
+    timings = []
+    tracemalloc.start()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        await job()
+        timings.append((time.perf_counter() - begin) * 1000)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    timings.sort()
+    return dict(
+        p50_ms=statistics.median(timings),
+        p95_ms=timings[math.ceil(len(timings) * 0.95) - 1],
+        ops_per_s=repeat / elapsed,
+        peak_kb=peak / 1024,
+    )
+
+
+async def run_size(size: int, workdir: Path, repeat: int) -> dict:
+    engine = create_async_engine(
+        f'sqlite+aiosqlite:///{workdir / f"bench_{size}.db"}'
+    )
+    session_factory = sessionmaker(engine, class_=AsyncSession)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with session_factory() as session:
+        await seed(session, size)
+
+    results = {}
+    async with session_factory() as session:
+        for backend in BACKENDS:
+            settings.allocation_backend = backend
+            open_queue.invalidate()
+
+            async def create_and_donate():
+                donation = await donation_crud.create(
+                    DonationCreate(full_amount=10), session
+                )
+                await donate(donation, session)
+
+            results[f'donate[{backend}]'] = await measure(
+                create_and_donate, repeat
+            )
+        settings.allocation_backend = 'orm'
+        open_queue.invalidate()
+        results['CRUDBase.create'] = await measure(
+            lambda: donation_crud.create(
+                DonationCreate(full_amount=10), session
+            ), repeat,
+        )
+        results['get_multi'] = await measure(
+            lambda: donation_crud.get_multi(session), max(1, repeat // 10)
+        )
+        await allocation_writer.stop()
+    await engine.dispose()
+    return results
+
+
+def measure_endpoints(size: int, workdir: Path, repeat: int) -> dict:
+    engine = create_async_engine(
+        f'sqlite+aiosqlite:///{workdir / f"bench_{size}.db"}'
+    )
+    session_factory = sessionmaker(engine, class_=AsyncSession)
+
+    async def override_session():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_async_session] = override_session
+    results = {}
+    try:
+        with TestClient(app) as client:
+            for path in ('/charity_project/', '/donation/'):
+                async def get(path=path):
+                    client.get(path)
+                results[f'GET {path}'] = asyncio.run(
+                    measure(get, max(1, repeat // 10))
+                )
+    finally:
+        app.dependency_overrides.pop(get_async_session, None)
+    return results
+
+
+def compare(current: dict, previous: dict, threshold: float) -> list[str]:
+    """Метрики, ухудшившиеся больше чем на threshold (доля)."""
+    regressions = []
+    for size, operations in current.items():
+        for operation, metrics in operations.items():
+            before = previous.get(size, {}).get(operation)
+            if not before:
+                continue
+            for metric, value in metrics.items():
+                old = before.get(metric)
+                if not old:
+                    continue
+                if metric == 'ops_per_s':
+                    worse = value < old * (1 - threshold)
+                else:
+                    worse = value > old * (1 + threshold)
+                if worse:
+                    regressions.append(
+                        f'{size} {operation} {metric}: {old:.2f} -> {value:.2f}'
+                    )
+    return regressions
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--output', type=Path)
+    parser.add_argument('--compare', type=Path)
+    parser.add_argument('--threshold', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            results[str(size)] = asyncio.run(
+                run_size(size, Path(workdir), args.repeat)
+            )
+            results[str(size)].update(
+                measure_endpoints(size, Path(workdir), args.repeat)
+            )
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(output)
+    print(output)
+
+    if args.compare:
+        regressions = compare(
+            results, json.loads(args.compare.read_text()), args.threshold
+        )
+        for line in regressions:
+            print(f'РЕГРЕССИЯ {line}', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
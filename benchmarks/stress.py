@@ -0,0 +1,203 @@
+"""Нагрузочный прогон с проверкой денежных инвариантов.
+
+Запуск:
+    python -m benchmarks.stress --donations 5000 --projects 200 --concurrency 200
+
+Приложение поднимается в процессе на отдельной базе SQLite, запросы
+к /donation/ и /charity_project/ идут одновременно через httpx
+(ASGITransport), авторизация подменяется через dependency_overrides.
+После прогона печатаются перцентили задержки, пропускная способность
+и нарушения инвариантов; при нарушениях код возврата 1.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+import httpx
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.db import Base, get_async_session
+from app.core.user import current_superuser, current_user
+from app.main import app
+from app.models import CharityProject, Donation, User
+from app.services.charity_services import allocation_writer
+from app.services.open_queue import open_queue
+
+STRESS_USER = User(id=1, is_active=True, is_verified=True, is_superuser=True)
+
+
+async def check_invariants(session: AsyncSession) -> list[str]:
+    """Нарушения денежных инвариантов распределения."""
+    violations = []
+    totals = []
+    for model in (CharityProject, Donation):
+        invested = await session.scalar(
+            select(func.coalesce(func.sum(model.invested_amount), 0))
+        )
+        totals.append(invested)
+        overinvested = await session.scalar(
+            select(func.count()).where(
+                model.invested_amount > model.full_amount
+            )
+        )
+        if overinvested:
+            violations.append(
+                f'{model.__tablename__}: вложено больше полной суммы '
+                f'в {overinvested} строках'
+            )
+        inconsistent = await session.scalar(
+            select(func.count()).where(or_(
+                (model.fully_invested.is_(True)) &
+                (model.invested_amount != model.full_amount),
+                (model.fully_invested.is_(False)) &
+                (model.invested_amount == model.full_amount),
+            ))
+        )
+        if inconsistent:
+            violations.append(
+                f'{model.__tablename__}: флаг fully_invested не совпадает '
+                f'с суммами в {inconsistent} строках'
+            )
+    if totals[0] != totals[1]:
+        violations.append(
+            f'сумма вложений проектов {totals[0]} не равна сумме '
+            f'распределённых пожертвований {totals[1]}'
+        )
+    open_counts = [
+        await session.scalar(
+            select(func.count()).where(model.fully_invested.is_(False))
+        ) for model in (CharityProject, Donation)
+    ]
+    if all(open_counts):
+        violations.append(
+            'одновременно есть открытые проекты и свободные пожертвования'
+        )
+    return violations
+
+
+def percentile(timings: list[float], share: float) -> float:
+    return timings[max(0, math.ceil(len(timings) * share) - 1)]
+
+
+async def run(
+    donations: int,
+    projects: int,
+    concurrency: int,
+    workdir: Path,
+    seed: int = 0,
+) -> dict:
+    engine = create_async_engine(
+        f'sqlite+aiosqlite:///{workdir / "stress.db"}'
+    )
+    session_factory = sessionmaker(engine, class_=AsyncSession)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    async def override_session():
+        async with session_factory() as session:
+            yield session
+
+    overrides = app.dependency_overrides
+    app.dependency_overrides = {
+        get_async_session: override_session,
+        current_user: lambda: STRESS_USER,
+        current_superuser: lambda: STRESS_USER,
+    }
+    open_queue.invalidate()
+    randomizer = random.Random(seed)
+    requests = [
+        ('/donation/', dict(full_amount=randomizer.randint(1, 1000)))
+        for _ in range(donations)
+    ] + [
+        ('/charity_project/', dict(
+            name=f'Stress {number}', description='Stress',
+            full_amount=randomizer.randint(1000, 50000),
+        )) for number in range(projects)
+    ]
+    randomizer.shuffle(requests)
+
+    timings = []
+    statuses = Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(client: httpx.AsyncClient, path: str, body: dict):
+        async with semaphore:
+            begin = time.perf_counter()
+            response = await client.post(path, json=body)
+            timings.append((time.perf_counter() - begin) * 1000)
+            statuses[response.status_code] += 1
+
+    # Без startup: очередь memory строится лениво на тестовой базе.
+    try:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(
+                app=app, raise_app_exceptions=False
+            ),
+            base_url='http://stress',
+        ) as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(
+                send(client, path, body) for path, body in requests
+            ))
+            elapsed = time.perf_counter() - started
+    finally:
+        await allocation_writer.stop()
+        app.dependency_overrides = overrides
+        open_queue.invalidate()
+    async with session_factory() as session:
+        violations = await check_invariants(session)
+    await engine.dispose()
+
+    timings.sort()
+    return dict(
+        requests=len(requests),
+        errors=sum(
+            count for code, count in statuses.items() if code != 200
+        ),
+        statuses={str(code): count for code, count in statuses.items()},
+        concurrency=concurrency,
+        backend=settings.allocation_backend,
+        p50_ms=percentile(timings, 0.5),
+        p95_ms=percentile(timings, 0.95),
+        p99_ms=percentile(timings, 0.99),
+        max_ms=timings[-1],
+        requests_per_s=len(requests) / elapsed,
+        violations=violations,
+    )
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--donations', type=int, default=2000)
+    parser.add_argument('--projects', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument(
+        '--backend', choices=('orm', 'memory', 'window'),
+        default=settings.allocation_backend,
+    )
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    settings.allocation_backend = args.backend
+    with tempfile.TemporaryDirectory() as workdir:
+        report = asyncio.run(run(
+            args.donations, args.projects, args.concurrency,
+            Path(workdir), args.seed,
+        ))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return 1 if report['violations'] or report['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -39,6 +39,7 @@ except (NameError, ImportError):
         'Проверьте и поправьте: она должна быть доступна в модуле `app.schemas.user`.',
     )
 
+from app.core.cache import data_version  # noqa: E402
 
 BASE_DIR = Path(__file__).resolve(strict=True).parent.parent
 
@@ -70,6 +71,8 @@ async def init_db():
     yield
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
+    # Пересоздание таблиц идёт мимо сессий и не меняет версию данных.
+    data_version.bump()
 
 
 @pytest.fixture
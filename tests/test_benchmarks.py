@@ -0,0 +1,12 @@
+from benchmarks.allocation import compare
+
+
+def test_compare_flags_regressions_above_threshold():
+    previous = {'100': {'donate[orm]': {'p50_ms': 10.0, 'ops_per_s': 100.0}}}
+    current = {'100': {'donate[orm]': {'p50_ms': 13.0, 'ops_per_s': 95.0}}}
+    assert compare(current, previous, 0.2) == ['100 donate[orm] p50_ms: 10.00 -> 13.00'], (
+        'Сравнение должно отмечать только метрики, ухудшившиеся сильнее порога.'
+    )
+    assert compare(current, {}, 0.2) == [], (
+        'Метрики без прошлого значения не должны считаться регрессией.'
+    )
@@ -1,6 +1,15 @@
+import asyncio
 from datetime import datetime
 
 import pytest
+from conftest import TestingSessionLocal
+
+from app.api.endpoints.charity_project import create_charity_projects_bulk
+from app.models import CharityProject, Donation
+from app.schemas.charity_project import CharityProjectCreate
+from app.services.charity_services import allocation_writer
+from app.services.open_queue import open_queue
+from app.services.simulation import simulate
 
 
 @pytest.mark.parametrize(
@@ -621,3 +630,113 @@ def test_get_all_charity_project_not_auth_user(test_client, charity_project, cha
             'name': 'nunchaku'
         }
     ]
+
+
+def test_create_projects_bulk(superuser_client, donation, another_donation):
+    response = superuser_client.post('/charity_project/bulk', json=[
+        {'name': 'First', 'description': 'First project', 'full_amount': 1000},
+        {'name': 'Second', 'description': 'Second project', 'full_amount': 5000},
+    ])
+    assert response.status_code == 200, (
+        'При массовом создании проектов должен возвращаться статус-код 200.'
+    )
+    data = response.json()
+    assert [project['name'] for project in data] == ['First', 'Second'], (
+        'Проекты должны возвращаться в порядке создания.'
+    )
+    assert data[0]['invested_amount'] == 1000 and data[0]['fully_invested'], (
+        'Ожидающие пожертвования должны заполнять первый новый проект.'
+    )
+    assert data[1]['invested_amount'] == 1100 and not data[1]['fully_invested'], (
+        'Остаток ожидающих пожертвований должен перейти во второй новый проект.'
+    )
+
+
+async def test_create_projects_bulk_insert_waits_for_writer():
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def busy():
+        started.set()
+        await release.wait()
+        async with TestingSessionLocal() as session:
+            session.add(Donation(full_amount=10))
+            await session.commit()
+
+    busy_job = asyncio.ensure_future(allocation_writer.submit(busy))
+    await started.wait()
+    async with TestingSessionLocal() as session:
+        bulk = asyncio.ensure_future(create_charity_projects_bulk(
+            [CharityProjectCreate(name='Bulk', description='Bulk', full_amount=10)],
+            session,
+        ))
+        await asyncio.sleep(0.1)
+        release.set()
+        await asyncio.wait_for(busy_job, timeout=2)
+        projects = await bulk
+    await allocation_writer.stop()
+    assert projects[0].fully_invested, (
+        'Вставка проектов не должна держать блокировку записи, пока '
+        'выполняется другое распределение.'
+    )
+
+
+@pytest.mark.parametrize('json', [
+    [
+        {'name': 'Same', 'description': 'First', 'full_amount': 10},
+        {'name': 'Same', 'description': 'Second', 'full_amount': 10},
+    ],
+    [
+        {'name': 'chimichangas4life', 'description': 'First', 'full_amount': 10},
+    ],
+])
+def test_create_projects_bulk_duplicate_names(superuser_client, charity_project, json):
+    response = superuser_client.post('/charity_project/bulk', json=json)
+    assert response.status_code == 400, (
+        'При массовом создании проектов с повторяющимися названиями '
+        'должен возвращаться статус-код 400.'
+    )
+    assert len(superuser_client.get('/charity_project/').json()) == 1, (
+        'Проекты с повторяющимися названиями не должны создаваться.'
+    )
+
+
+
+def test_simulate_charity_project(superuser_client, donation, another_donation):
+    response = superuser_client.post('/charity_project/simulate', json={'full_amount': 1000})
+    assert response.status_code == 200, (
+        'Расчёт распределения должен возвращать статус-код 200.'
+    )
+    assert response.json() == {
+        'invested_amount': 1000,
+        'fully_invested': True,
+        'used': [
+            {'id': donation.id, 'amount': 100, 'fully_invested': True},
+            {'id': another_donation.id, 'amount': 900, 'fully_invested': False},
+        ],
+    }, 'Расчёт должен показывать, какие пожертвования покроют проект.'
+    assert superuser_client.get('/charity_project/').json() == [], (
+        'Расчёт распределения не должен создавать проект.'
+    )
+    donations = superuser_client.get('/donation/').json()
+    assert all(item['invested_amount'] == 0 for item in donations), (
+        'Расчёт распределения не должен менять пожертвования.'
+    )
+
+
+async def test_simulate_uses_resident_queue_copy(donation, another_donation):
+    async with TestingSessionLocal() as session:
+        await open_queue.rebuild(session)
+        try:
+            result = await simulate(CharityProject, 5000, session)
+            queue = [
+                (entry.id, entry.invested_amount)
+                for entry in open_queue.queues[Donation]
+            ]
+        finally:
+            open_queue.invalidate()
+    assert result['invested_amount'] == 2100 and not result['fully_invested'], (
+        'Расчёт по резидентной очереди должен учитывать все ожидающие пожертвования.'
+    )
+    assert queue == [(donation.id, 0), (another_donation.id, 0)], (
+        'Расчёт не должен изменять резидентную очередь.'
+    )
@@ -1,6 +1,17 @@
+import asyncio
 from datetime import datetime
 
 import pytest
+from conftest import TestingSessionLocal
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models import CharityProject, Donation, User
+from app.schemas.donation import DonationCreate, DonationDBBase
+from app.services.charity_services import allocation_writer, donate
+from app.services.donation_batcher import DonationBatcher
+from app.services.donation_import import import_donations
+from app.services.open_queue import open_queue
 
 
 @pytest.mark.parametrize('json, keys, expected_data', [
@@ -178,3 +189,157 @@ def test_create_donation_check_create_date(user_client):
     assert response_1.json()['create_date'] != response_2.json()['create_date'], (
         'При создании двух пожертвований с паузой (в 1 секунду, например) у них должны быть разные `create_date`'
     )
+
+
+
+async def test_donation_batch_allocated_in_order(charity_project, monkeypatch):
+    """Пакет пожертвований должен распределяться за один проход в порядке поступления."""
+    monkeypatch.setattr(settings, 'donation_batch_size', 3)
+    batcher = DonationBatcher(TestingSessionLocal)
+    donor = User(id=2)
+    results = await asyncio.gather(*(
+        batcher.submit(DonationCreate(full_amount=amount), donor)
+        for amount in (400000, 400000, 400000)
+    ))
+    await allocation_writer.stop()
+    assert all(isinstance(result, DonationDBBase) for result in results), test_donation_batch_allocated_in_order.__doc__
+    assert [result.full_amount for result in results] == [400000] * 3, test_donation_batch_allocated_in_order.__doc__
+    assert len({result.id for result in results}) == 3, test_donation_batch_allocated_in_order.__doc__
+    async with TestingSessionLocal() as session:
+        project = await session.get(CharityProject, charity_project.id)
+        donations = (await session.execute(
+            select(Donation).order_by(Donation.id)
+        )).scalars().all()
+    assert project.fully_invested, test_donation_batch_allocated_in_order.__doc__
+    assert project.invested_amount == 1000000, test_donation_batch_allocated_in_order.__doc__
+    assert [donation.invested_amount for donation in donations] == [
+        400000, 400000, 200000
+    ], test_donation_batch_allocated_in_order.__doc__
+
+
+async def test_donation_batch_insert_waits_for_writer():
+    """Вставка пакета не должна держать блокировку записи, пока выполняется другое распределение."""
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def busy():
+        started.set()
+        await release.wait()
+        async with TestingSessionLocal() as session:
+            session.add(CharityProject(name='Busy', description='Busy', full_amount=10))
+            await session.commit()
+
+    busy_job = asyncio.ensure_future(allocation_writer.submit(busy))
+    await started.wait()
+    async with TestingSessionLocal() as session:
+        batch = asyncio.ensure_future(DonationBatcher.insert_and_donate(
+            [(DonationCreate(full_amount=10), User(id=2), None)], session
+        ))
+        await asyncio.sleep(0.1)
+        release.set()
+        await asyncio.wait_for(busy_job, timeout=2)
+        await batch
+        project = (await session.execute(select(CharityProject))).scalar_one()
+    await allocation_writer.stop()
+    assert project.fully_invested, test_donation_batch_insert_waits_for_writer.__doc__
+
+
+@pytest.mark.parametrize('content_type, body', [
+    (
+        'application/x-ndjson',
+        '{"full_amount": 600000, "user_id": 2}\n'
+        '{"full_amount": 600000, "comment": "old"}\n'
+        '{"full_amount": 100, "create_date": "2009-01-01T00:00:00"}\n',
+    ),
+    (
+        'text/csv',
+        'full_amount,comment,user_id\n'
+        '600000,,2\n'
+        '600000,old,\n'
+        '100,,\n',
+    ),
+])
+def test_import_donations(superuser_client, charity_project, content_type, body, monkeypatch):
+    monkeypatch.setattr(settings, 'donation_import_chunk_size', 2)
+    response = superuser_client.post(
+        '/donation/import', data=body.encode(), headers={'Content-Type': content_type}
+    )
+    assert response.status_code == 200, (
+        'При импорте пожертвований должен возвращаться статус-код 200.'
+    )
+    assert response.json() == {
+        'imported': 3, 'allocated': 1000000, 'projects_closed': 1,
+    }, 'Сводка импорта должна учитывать строки, распределённую сумму и закрытые проекты.'
+    donations = superuser_client.get('/donation/').json()
+    assert [donation['invested_amount'] for donation in donations] == [600000, 400000, 0], (
+        'Импортированные пожертвования должны распределяться по открытым проектам.'
+    )
+    assert charity_project.fully_invested, (
+        'Проект, собравший сумму при импорте, должен закрываться.'
+    )
+
+
+@pytest.mark.parametrize('backend', ['orm', 'memory', 'window'])
+async def test_import_donations_interleaved_with_donation(monkeypatch, backend):
+    """Пожертвование между пачками импорта должно видеть суммы, внесённые импортом."""
+    monkeypatch.setattr(settings, 'allocation_backend', backend)
+    open_queue.invalidate()
+    async with TestingSessionLocal() as session:
+        project = CharityProject(name='Import', description='Import', full_amount=1000)
+        session.add(project)
+        await session.commit()
+        await session.refresh(project)
+        project_id = project.id
+        await donate(project, session)
+
+    async def stream():
+        yield b'{"full_amount": 300}\n'
+        async with TestingSessionLocal() as session:
+            donation = Donation(full_amount=1000)
+            session.add(donation)
+            await session.commit()
+            await session.refresh(donation)
+            await donate(donation, session)
+        yield b'{"full_amount": 50}\n'
+
+    async with TestingSessionLocal() as session:
+        await import_donations(stream(), 'application/x-ndjson', session, chunk_size=1)
+        # Импортированная строка создана раньше и стоит в очереди первой.
+        late = CharityProject(name='Late', description='Late', full_amount=50)
+        session.add(late)
+        await session.commit()
+        await session.refresh(late)
+        await donate(late, session)
+        await allocation_writer.stop()
+        project = await session.get(CharityProject, project_id)
+        donations = (await session.execute(
+            select(Donation).order_by(Donation.id)
+        )).scalars().all()
+    open_queue.invalidate()
+    assert project.invested_amount == 1000, test_import_donations_interleaved_with_donation.__doc__
+    assert [donation.invested_amount for donation in donations] == [
+        300, 700, 50
+    ], test_import_donations_interleaved_with_donation.__doc__
+
+
+def test_import_donations_invalid_line(superuser_client):
+    response = superuser_client.post(
+        '/donation/import',
+        data=b'{"full_amount": 10}\n{"full_amount": -1}\n',
+        headers={'Content-Type': 'application/x-ndjson'},
+    )
+    assert response.status_code == 422, (
+        'Некорректная строка импорта должна приводить к ошибке 422.'
+    )
+    assert response.json()['detail'].startswith('Строка 2'), (
+        'В ошибке импорта должен указываться номер строки.'
+    )
+
+
+def test_import_donations_superuser_only(user_client):
+    response = user_client.post(
+        '/donation/import', data=b'{"full_amount": 10}\n',
+        headers={'Content-Type': 'application/x-ndjson'},
+    )
+    assert response.status_code == 401, (
+        'Импорт пожертвований должен быть доступен только суперпользователю.'
+    )
@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from app.core.config import settings
+
+
+@pytest.mark.parametrize('url, fixtures', [
+    ('/donation/', ('donation', 'another_donation')),
+    ('/charity_project/', ('charity_project', 'charity_project_nunchaku')),
+])
+def test_export_ndjson_matches_list(
+        superuser_client, monkeypatch, request, url, fixtures
+):
+    for name in fixtures:
+        request.getfixturevalue(name)
+    monkeypatch.setattr(settings, 'export_chunk_size', 1)
+    response = superuser_client.get(f'{url}export')
+    assert response.status_code == 200, (
+        'Выгрузка должна возвращать статус-код 200.'
+    )
+    assert response.headers['content-type'] == 'application/x-ndjson', (
+        'По умолчанию выгрузка должна идти в формате NDJSON.'
+    )
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert rows == superuser_client.get(url).json(), (
+        'Строки выгрузки должны совпадать с элементами списка.'
+    )
+
+
+def test_export_json_array(superuser_client, donation, another_donation):
+    response = superuser_client.get('/donation/export?format=json')
+    assert response.json() == superuser_client.get('/donation/').json(), (
+        'Выгрузка format=json должна быть JSON-массивом всех строк.'
+    )
+
+
+def test_export_empty_json_array(superuser_client):
+    response = superuser_client.get('/charity_project/export?format=json')
+    assert response.json() == [], (
+        'Выгрузка пустой таблицы должна быть пустым массивом.'
+    )
+
+
+def test_export_superuser_only(user_client):
+    assert user_client.get('/donation/export').status_code == 401, (
+        'Выгрузка должна быть доступна только суперпользователям.'
+    )
@@ -0,0 +1,34 @@
+import pytest
+
+from app.core.cache import response_cache
+from app.core.config import settings
+
+
+@pytest.mark.parametrize('url', [
+    '/charity_project/', '/donation/', '/donation/?limit=1',
+])
+def test_fast_list_same_body(
+        superuser_client, charity_project, small_fully_charity_project,
+        donation, another_donation, monkeypatch, url
+):
+    # Иначе второй запрос получил бы из кэша ответов первое же тело.
+    monkeypatch.setattr(response_cache, 'max_size', 0)
+    regular = superuser_client.get(url)
+    monkeypatch.setattr(settings, 'fast_list_responses', True)
+    fast = superuser_client.get(url)
+    assert fast.content == regular.content, (
+        'Быстрый путь должен отдавать то же тело ответа, байт в байт.'
+    )
+    assert fast.headers.get('Link') == regular.headers.get('Link'), (
+        'Быстрый путь должен сохранять ссылку на следующую страницу.'
+    )
+
+
+def test_fast_my_donations_same_body(user_client, monkeypatch):
+    user_client.post('/donation/', json={'full_amount': 10, 'comment': 'Мяу'})
+    user_client.post('/donation/', json={'full_amount': 20})
+    regular = user_client.get('/donation/my')
+    monkeypatch.setattr(settings, 'fast_list_responses', True)
+    assert user_client.get('/donation/my').content == regular.content, (
+        'Быстрый путь для своих пожертвований должен совпадать с обычным.'
+    )
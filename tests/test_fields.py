@@ -0,0 +1,43 @@
+def test_project_fields(user_client, charity_project, charity_project_nunchaku):
+    response = user_client.get(
+        '/charity_project/?fields=name,full_amount,invested_amount'
+    )
+    assert response.status_code == 200, (
+        'Список с fields должен возвращаться со статусом 200.'
+    )
+    assert response.json() == [
+        {
+            'id': project.id, 'name': project.name,
+            'full_amount': project.full_amount, 'invested_amount': 0,
+        } for project in (charity_project, charity_project_nunchaku)
+    ], 'В ответе должны быть только запрошенные поля и id.'
+
+
+def test_fields_keep_pagination(superuser_client, donation, another_donation):
+    response = superuser_client.get(
+        '/donation/?fields=full_amount,create_date&limit=1'
+    )
+    assert response.json() == [{
+        'id': donation.id, 'full_amount': donation.full_amount,
+        'create_date': donation.create_date.isoformat(),
+    }], 'Даты должны сериализоваться так же, как в полном ответе.'
+    assert 'next' in response.links, (
+        'Выборка полей не должна терять ссылку на следующую страницу.'
+    )
+
+
+def test_my_donations_fields(user_client):
+    user_client.post('/donation/', json={'full_amount': 10})
+    response = user_client.get('/donation/my?fields=full_amount')
+    assert [
+        sorted(item) for item in response.json()
+    ] == [['full_amount', 'id']], (
+        'В списке своих пожертвований должны быть только запрошенные поля.'
+    )
+
+
+def test_unknown_fields(user_client):
+    response = user_client.get('/donation/my?fields=full_amount,user_id')
+    assert response.status_code == 422, (
+        'Поле, которого нет в ответе эндпоинта, должно давать 422.'
+    )
@@ -0,0 +1,77 @@
+from app.core.cache import fragment_cache
+from app.core.config import settings
+from app.core.metrics import fragment_cache_rows
+
+
+def fragment_counts() -> tuple:
+    return (
+        fragment_cache_rows.values.get(('hit',), 0),
+        fragment_cache_rows.values.get(('miss',), 0),
+    )
+
+
+def test_only_changed_rows_reencoded(
+        user_client, charity_project, charity_project_nunchaku,
+        small_fully_charity_project, monkeypatch
+):
+    monkeypatch.setattr(settings, 'fast_list_responses', True)
+    user_client.get('/charity_project/')
+    hits, misses = fragment_counts()
+    user_client.post('/donation/', json={'full_amount': 10})
+    response = user_client.get('/charity_project/')
+    assert response.json()[0]['invested_amount'] == 10, (
+        'Изменённая строка должна кодироваться заново.'
+    )
+    new_hits, new_misses = fragment_counts()
+    assert (new_hits - hits, new_misses - misses) == (2, 1), (
+        'После пожертвования заново кодируется только изменённый проект, '
+        'остальные строки берутся из кэша фрагментов.'
+    )
+
+
+def test_fragments_same_body(
+        superuser_client, charity_project, small_fully_charity_project,
+        donation, another_donation, monkeypatch
+):
+    monkeypatch.setattr(fragment_cache, 'max_size', 0)
+    regular = superuser_client.get('/donation/?fields=comment,full_amount')
+    monkeypatch.undo()
+    for _ in range(2):
+        response = superuser_client.get(
+            '/donation/?fields=comment,full_amount'
+        )
+        assert response.content == regular.content, (
+            'Тело, собранное из фрагментов, должно совпадать с обычным, '
+            'байт в байт.'
+        )
+
+
+def test_fragment_cache_bounded(monkeypatch):
+    monkeypatch.setattr(fragment_cache, 'max_size', 2)
+    fragment_cache.clear()
+    for id in range(3):
+        fragment_cache.put(('donation', ('id',), id), (id,), b'{}')
+    assert list(fragment_cache.entries) == [
+        ('donation', ('id',), 1), ('donation', ('id',), 2)
+    ], 'Кэш фрагментов должен вытеснять давно не использованные строки.'
+    assert fragment_cache.get(('donation', ('id',), 2), (3,)) is None, (
+        'Фрагмент с другими значениями строки не должен отдаваться.'
+    )
+
+
+def test_fragments_keyed_by_id_in_schema_order(superuser_client, mixer,
+                                               monkeypatch):
+    monkeypatch.setattr(settings, 'fast_list_responses', True)
+    for _ in range(5):
+        mixer.blend(
+            'app.models.donation.Donation', full_amount=100,
+            invested_amount=0, fully_invested=False, user_id=None,
+        )
+    first = superuser_client.get('/donation/')
+    hits, misses = fragment_counts()
+    second = superuser_client.get('/donation/')
+    assert second.content == first.content
+    assert fragment_counts() == (hits + 5, misses), (
+        'Строки с одинаковой суммой должны кэшироваться по своему id, '
+        'даже когда id не первое поле схемы.'
+    )
@@ -0,0 +1,39 @@
+import pytest
+from conftest import TestingSessionLocal
+from sqlalchemy import false, select, text
+
+from app.models import CharityProject, Donation
+from app.services.allocation import fifo_order
+
+
+async def query_plan(statement) -> str:
+    async with TestingSessionLocal() as session:
+        connection = await session.connection()
+        compiled = statement.compile(
+            dialect=connection.dialect,
+            compile_kwargs={'literal_binds': True},
+        )
+        rows = await session.execute(text(f'EXPLAIN QUERY PLAN {compiled}'))
+        return ' '.join(row[-1] for row in rows)
+
+
+@pytest.mark.parametrize('model', [CharityProject, Donation])
+async def test_open_queue_uses_partial_index(model):
+    plan = await query_plan(
+        select(model).where(
+            model.fully_invested == false()
+        ).order_by(*fifo_order(model))
+    )
+    assert f'ix_{model.__tablename__}_open_fifo' in plan, (
+        'Чтение открытых строк должно идти по частичному индексу.'
+    )
+    assert 'TEMP B-TREE' not in plan, (
+        'Порядок очереди должен обеспечиваться индексом без сортировки.'
+    )
+
+
+async def test_user_donations_use_index():
+    plan = await query_plan(select(Donation).where(Donation.user_id == 1))
+    assert 'ix_donation_user_id' in plan, (
+        'Пожертвования пользователя должны искаться по индексу user_id.'
+    )
@@ -1,4 +1,19 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
+from conftest import (
+    TestingSessionLocal, current_superuser, get_async_session, override_db
+)
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from fixtures.user import superuser
+
+from app.api.endpoints.charityproject import router as legacy_router
+from app.core.config import settings
+from app.models import CharityProject, Donation
+from app.services.charity_services import AllocationWriter, donate
+from app.services.open_queue import open_queue
 
 
 def test_donation_exist_non_project(superuser_client, donation):
@@ -45,3 +60,221 @@ def test_donation_to_little_invest_project(user_client, charity_project_little_i
     assert charity_project_little_invested.invested_amount == 1000, test_donation_to_little_invest_project.__doc__
     assert not charity_project_nunchaku.fully_invested, test_donation_to_little_invest_project.__doc__
     assert charity_project_nunchaku.invested_amount == 0, test_donation_to_little_invest_project.__doc__
+
+
+@pytest.fixture(params=['memory', 'window'])
+def allocation_backend(request, monkeypatch):
+    monkeypatch.setattr(settings, 'allocation_backend', request.param)
+    open_queue.invalidate()
+    yield request.param
+    open_queue.invalidate()
+
+
+def test_backend_fully_invested_amount_for_two_projects(user_client, allocation_backend, charity_project, charity_project_nunchaku):
+    """Альтернативные способы распределения должны давать тот же результат, что и цикл по объектам."""
+    user_client.post('/donation/', json={
+        'full_amount': 500000,
+    })
+    user_client.post('/donation/', json={
+        'full_amount': 500000,
+    })
+    assert charity_project.fully_invested, test_backend_fully_invested_amount_for_two_projects.__doc__
+    assert charity_project.close_date is not None, test_backend_fully_invested_amount_for_two_projects.__doc__
+    assert not charity_project_nunchaku.fully_invested, test_backend_fully_invested_amount_for_two_projects.__doc__
+    assert charity_project_nunchaku.invested_amount == 0, test_backend_fully_invested_amount_for_two_projects.__doc__
+
+
+def test_backend_donation_to_little_invest_project(user_client, allocation_backend, charity_project_little_invested, charity_project_nunchaku):
+    """Частично заполненный проект должен оставаться первым в очереди."""
+    for _ in range(3):
+        user_client.post('/donation/', json={
+            'full_amount': 300,
+        })
+    assert not charity_project_little_invested.fully_invested, test_backend_donation_to_little_invest_project.__doc__
+    assert charity_project_little_invested.invested_amount == 1000, test_backend_donation_to_little_invest_project.__doc__
+    assert charity_project_nunchaku.invested_amount == 0, test_backend_donation_to_little_invest_project.__doc__
+
+
+def test_memory_backend_keeps_partial_project_first(user_client, charity_project_little_invested, charity_project_nunchaku, monkeypatch):
+    """Частично заполненный проект должен оставаться первым в резидентной очереди."""
+    monkeypatch.setattr(settings, 'allocation_backend', 'memory')
+    open_queue.invalidate()
+    user_client.post('/donation/', json={
+        'full_amount': 300,
+    })
+    queue = open_queue.queues[type(charity_project_little_invested)]
+    open_queue.invalidate()
+    assert [entry.id for entry in queue] == [
+        charity_project_little_invested.id, charity_project_nunchaku.id
+    ], test_memory_backend_keeps_partial_project_first.__doc__
+    assert next(iter(queue)).invested_amount == 400, test_memory_backend_keeps_partial_project_first.__doc__
+
+
+def test_backend_new_project_takes_waiting_donations(superuser_client, allocation_backend, donation, another_donation):
+    """Новый проект должен забирать ожидающие пожертвования в порядке поступления."""
+    response = superuser_client.post('/charity_project/', json={
+        'name': 'Project',
+        'description': 'Description',
+        'full_amount': 1000,
+    })
+    data = response.json()
+    assert data['invested_amount'] == 1000, test_backend_new_project_takes_waiting_donations.__doc__
+    assert data['fully_invested'], test_backend_new_project_takes_waiting_donations.__doc__
+    donations = {item['id']: item for item in superuser_client.get('/donation/').json()}
+    assert donations[donation.id]['fully_invested'], test_backend_new_project_takes_waiting_donations.__doc__
+    assert donations[another_donation.id]['invested_amount'] == 900, test_backend_new_project_takes_waiting_donations.__doc__
+    assert not donations[another_donation.id]['fully_invested'], test_backend_new_project_takes_waiting_donations.__doc__
+
+
+async def test_allocation_writer_serializes_jobs():
+    """Распределения должны выполняться строго по одному в порядке поступления."""
+    writer = AllocationWriter()
+    events = []
+
+    async def job(name):
+        events.append(f'{name}-start')
+        await asyncio.sleep(0.01)
+        events.append(f'{name}-end')
+        return name
+
+    results = await asyncio.gather(
+        writer.submit(lambda: job('first')),
+        writer.submit(lambda: job('second')),
+    )
+    await writer.stop()
+    assert results == ['first', 'second'], test_allocation_writer_serializes_jobs.__doc__
+    assert events == [
+        'first-start', 'first-end', 'second-start', 'second-end'
+    ], test_allocation_writer_serializes_jobs.__doc__
+
+
+async def test_allocation_writer_stop_finishes_accepted_jobs():
+    """Остановка должна выполнить уже принятые задания, а не бросить их."""
+    writer = AllocationWriter()
+
+    async def job(name):
+        await asyncio.sleep(0.01)
+        return name
+
+    pending = [
+        asyncio.ensure_future(writer.submit(lambda name=name: job(name)))
+        for name in ('first', 'second', 'third')
+    ]
+    await asyncio.sleep(0)
+    await writer.stop()
+    results = await asyncio.wait_for(asyncio.gather(*pending), timeout=1)
+    assert results == ['first', 'second', 'third'], test_allocation_writer_stop_finishes_accepted_jobs.__doc__
+
+
+@pytest.mark.parametrize('backend', ['orm', 'memory', 'window'])
+async def test_stale_object_not_invested_twice(monkeypatch, backend):
+    """Объект, заполненный, пока его задание ждало очереди, не должен распределяться повторно."""
+    monkeypatch.setattr(settings, 'allocation_backend', backend)
+    monkeypatch.setattr(settings, 'allocation_single_writer', False)
+    open_queue.invalidate()
+    async with TestingSessionLocal() as handler, TestingSessionLocal() as other:
+        donation = Donation(full_amount=100)
+        handler.add(donation)
+        await handler.commit()
+        await handler.refresh(donation)
+        first = CharityProject(name='First', description='First', full_amount=100)
+        other.add(first)
+        await other.commit()
+        await other.refresh(first)
+        await donate(first, other)
+        second = CharityProject(name='Second', description='Second', full_amount=100)
+        other.add(second)
+        await other.commit()
+        # В сессии обработчика пожертвование всё ещё выглядит открытым.
+        assert donation.invested_amount == 0
+        await donate(donation, handler)
+        await other.refresh(second)
+    open_queue.invalidate()
+    assert second.invested_amount == 0, test_stale_object_not_invested_twice.__doc__
+    assert donation.invested_amount == 100, test_stale_object_not_invested_twice.__doc__
+
+
+def test_concurrent_donations_do_not_overinvest_project(user_client, charity_project, charity_project_nunchaku):
+    """Одновременные пожертвования не должны переполнять один и тот же проект."""
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        responses = list(executor.map(
+            lambda amount: user_client.post('/donation/', json={'full_amount': amount}),
+            (600000, 600000),
+        ))
+    assert all(response.status_code == 200 for response in responses), test_concurrent_donations_do_not_overinvest_project.__doc__
+    donations = user_client.get('/donation/my').json()
+    assert len(donations) == 2, test_concurrent_donations_do_not_overinvest_project.__doc__
+    assert charity_project.invested_amount == charity_project.full_amount, test_concurrent_donations_do_not_overinvest_project.__doc__
+    assert charity_project.fully_invested, test_concurrent_donations_do_not_overinvest_project.__doc__
+    assert charity_project_nunchaku.invested_amount == 200000, test_concurrent_donations_do_not_overinvest_project.__doc__
+
+
+@pytest.fixture
+def legacy_superuser_client():
+    legacy_app = FastAPI()
+    legacy_app.include_router(legacy_router, prefix='/charityproject')
+    legacy_app.dependency_overrides[get_async_session] = override_db
+    legacy_app.dependency_overrides[current_superuser] = lambda: superuser
+    with TestClient(legacy_app) as client:
+        yield client
+
+
+def test_legacy_router_allocates_like_donate(legacy_superuser_client, superuser_client, donation, another_donation):
+    """Старый роутер проектов должен распределять пожертвования так же, как и основной."""
+    response = legacy_superuser_client.post('/charityproject/', json={
+        'name': 'Legacy',
+        'description': 'Legacy project',
+        'full_amount': 1000000,
+    })
+    data = response.json()
+    assert data['invested_amount'] == 2100, test_legacy_router_allocates_like_donate.__doc__
+    assert not data['fully_invested'], test_legacy_router_allocates_like_donate.__doc__
+    donations = superuser_client.get('/donation/').json()
+    assert all(item['fully_invested'] for item in donations), test_legacy_router_allocates_like_donate.__doc__
+
+
+def test_donation_filled_across_fetch_portions(user_client, mixer, monkeypatch):
+    """Распределение должно переходить между порциями открытых проектов без потерь."""
+    for number in range(5):
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=f'Project {number}',
+            description='Portion',
+            full_amount=100,
+            invested_amount=0,
+            fully_invested=False,
+            close_date=None,
+        )
+    monkeypatch.setattr(settings, 'allocation_fetch_size', 1)
+    user_client.post('/donation/', json={'full_amount': 250})
+    projects = user_client.get('/charity_project/').json()
+    assert [project['invested_amount'] for project in projects] == [100, 100, 50, 0, 0], test_donation_filled_across_fetch_portions.__doc__
+    assert [project['fully_invested'] for project in projects] == [True, True, False, False, False], test_donation_filled_across_fetch_portions.__doc__
+
+
+@pytest.mark.parametrize('backend', ['orm', 'memory', 'window'])
+def test_investment_ledger_breakdown(superuser_client, donation, another_donation, monkeypatch, backend):
+    """Каждое распределение должно записываться в журнал вложений."""
+    monkeypatch.setattr(settings, 'allocation_backend', backend)
+    open_queue.invalidate()
+    project = superuser_client.post('/charity_project/', json={
+        'name': 'Ledger',
+        'description': 'Ledger project',
+        'full_amount': 1000,
+    }).json()
+    open_queue.invalidate()
+    breakdown = superuser_client.get(f'/charity_project/{project["id"]}/investments').json()
+    assert [(item['donation_id'], item['amount']) for item in breakdown] == [
+        (donation.id, 100), (another_donation.id, 900),
+    ], test_investment_ledger_breakdown.__doc__
+    breakdown = superuser_client.get(f'/donation/{another_donation.id}/investments').json()
+    assert [(item['project_id'], item['amount']) for item in breakdown] == [
+        (project['id'], 900),
+    ], test_investment_ledger_breakdown.__doc__
+
+
+def test_investment_breakdown_unknown_project(user_client):
+    response = user_client.get('/charity_project/100500/investments')
+    assert response.status_code == 404, (
+        'Журнал вложений несуществующего проекта должен возвращать 404.'
+    )
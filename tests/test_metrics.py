@@ -0,0 +1,37 @@
+from app.core.metrics import Histogram
+
+
+def test_metrics_endpoint(user_client, charity_project):
+    user_client.post('/donation/', json={'full_amount': 10})
+    response = user_client.get('/metrics')
+    assert response.status_code == 200, (
+        'Эндпоинт /metrics должен быть доступен без авторизации.'
+    )
+    assert response.headers['content-type'].startswith('text/plain'), (
+        'Метрики должны отдаваться в текстовом формате Prometheus.'
+    )
+    text = response.text
+    for line in (
+        'qrkot_request_duration_seconds_count'
+        '{method="POST",route="/donation/"}',
+        'qrkot_allocation_duration_seconds_count{backend="orm"}',
+        'qrkot_allocation_rows_touched_bucket{backend="orm",le="1"}',
+        'qrkot_open_queue_depth{model="charityproject"} 1',
+        'qrkot_open_queue_depth{model="donation"} 0',
+        'qrkot_sql_commits_total',
+        'qrkot_sql_pool_checkouts_total',
+    ):
+        assert line in text, f'В метриках должна быть строка `{line}`.'
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('latency', 'Задержка.', ('route',), (0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3):
+        histogram.observe(value, '/')
+    assert histogram.collect()[2:] == [
+        'latency_bucket{route="/",le="0.1"} 1',
+        'latency_bucket{route="/",le="1.0"} 3',
+        'latency_bucket{route="/",le="+Inf"} 4',
+        'latency_sum{route="/"} 4.05',
+        'latency_count{route="/"} 4',
+    ], 'Корзины гистограммы должны накапливаться по возрастанию границ.'
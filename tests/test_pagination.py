@@ -0,0 +1,91 @@
+import pytest
+
+from app.api.pagination import encode_cursor
+from app.core.user import deferred_current_user
+from conftest import app
+from fixtures.user import superuser, user
+
+
+@pytest.fixture
+def projects(mixer):
+    return [
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=f'Проект {number}', full_amount=100, invested_amount=0,
+            fully_invested=False,
+        ) for number in range(5)
+    ]
+
+
+def deferred(user):
+    async def resolve():
+        return user
+    return lambda: resolve
+
+
+def test_keyset_pages(user_client, projects):
+    ids = []
+    url = '/charity_project/?limit=2'
+    pages = 0
+    while url:
+        response = user_client.get(url)
+        assert response.status_code == 200, (
+            'Страница списка проектов должна возвращаться со статусом 200.'
+        )
+        assert isinstance(response.json(), list), (
+            'Тело страницы должно оставаться списком.'
+        )
+        ids.extend(item['id'] for item in response.json())
+        pages += 1
+        url = response.links.get('next', {}).get('url')
+    assert ids == sorted(project.id for project in projects), (
+        'Страницы должны без пропусков и повторов покрывать весь список '
+        'в порядке id.'
+    )
+    assert pages == 3, 'Пять проектов по два на страницу — три страницы.'
+
+
+def test_next_cursor_header(user_client, projects):
+    response = user_client.get('/charity_project/?limit=4')
+    assert response.headers['X-Next-Cursor'] == encode_cursor(projects[3].id), (
+        'Курсор следующей страницы должен указывать на последний id страницы.'
+    )
+    last = user_client.get(
+        f'/charity_project/?limit=4&after={response.headers["X-Next-Cursor"]}'
+    )
+    assert [item['id'] for item in last.json()] == [projects[4].id]
+    assert 'X-Next-Cursor' not in last.headers, (
+        'У последней страницы не должно быть курсора продолжения.'
+    )
+
+
+def test_invalid_cursor(user_client):
+    response = user_client.get('/charity_project/?after=not-a-cursor')
+    assert response.status_code == 422, (
+        'Некорректный курсор должен давать статус-код 422.'
+    )
+
+
+def test_unpaginated_only_for_superuser(user_client, projects):
+    app.dependency_overrides[deferred_current_user] = deferred(user)
+    response = user_client.get('/charity_project/?all=true')
+    assert response.status_code == 403, (
+        'Список без страниц не должен отдаваться обычному пользователю.'
+    )
+    app.dependency_overrides[deferred_current_user] = deferred(superuser)
+    response = user_client.get('/charity_project/?all=true&limit=1')
+    assert len(response.json()) == len(projects), (
+        'Суперпользователь должен получать весь список с all=true.'
+    )
+
+
+def test_my_donations_paginated(user_client):
+    for amount in (10, 20, 30):
+        user_client.post('/donation/', json={'full_amount': amount})
+    first = user_client.get('/donation/my?limit=2')
+    second = user_client.get(first.links['next']['url'])
+    assert [
+        item['full_amount'] for item in first.json() + second.json()
+    ] == [10, 20, 30], (
+        'Пожертвования пользователя должны листаться по страницам.'
+    )
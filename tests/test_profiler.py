@@ -0,0 +1,70 @@
+from app.services.profiler import profiler
+
+
+def test_profile_next_requests(superuser_client, donation):
+    response = superuser_client.post('/profiler/', json={
+        'route': '/donation/', 'method': 'GET', 'requests': 2,
+    })
+    assert response.status_code == 200, (
+        'Суперпользователь должен иметь возможность запустить профилирование.'
+    )
+    assert response.json()['running'], 'Сеанс профилирования должен начаться.'
+    superuser_client.post('/charity_project/', json={
+        'name': 'Не профилируется', 'description': 'Другой маршрут',
+        'full_amount': 100,
+    })
+    for _ in range(2):
+        superuser_client.get('/donation/')
+    report = superuser_client.get('/profiler/').json()
+    assert not report['running'], (
+        'Профилирование должно останавливаться после заданного числа запросов.'
+    )
+    assert report['profiled_requests'] == 2, (
+        'Профилироваться должны только запросы к выбранному маршруту.'
+    )
+    assert 'get_all_donations' in report['output'], (
+        'Отчёт cProfile должен содержать функции обработчика.'
+    )
+    assert isinstance(report['memory'], list), (
+        'Отчёт должен содержать разницу снимков tracemalloc.'
+    )
+
+
+def test_profile_sampling_stopped_early(superuser_client):
+    response = superuser_client.post('/profiler/', json={
+        'route': '/donation/', 'mode': 'sampling', 'seconds': 60,
+    })
+    assert response.status_code == 200, (
+        'Суперпользователь должен иметь возможность запустить сэмплирование.'
+    )
+    assert superuser_client.post('/profiler/', json={
+        'route': '/donation/', 'seconds': 60,
+    }).status_code == 409, (
+        'Второй сеанс профилирования не должен запускаться параллельно.'
+    )
+    superuser_client.get('/donation/')
+    report = superuser_client.delete('/profiler/').json()
+    assert not report['running'], (
+        'DELETE /profiler/ должен останавливать профилирование.'
+    )
+    assert report['profiled_requests'] == 1, (
+        'Запрос к маршруту должен попасть в сеанс сэмплирования.'
+    )
+    assert not profiler.running
+
+
+def test_profiler_validation(superuser_client):
+    assert superuser_client.post('/profiler/', json={
+        'route': '/nothing/', 'requests': 1,
+    }).status_code == 404, 'Неизвестный маршрут должен давать 404.'
+    assert superuser_client.post('/profiler/', json={
+        'route': '/donation/',
+    }).status_code == 422, (
+        'Без числа запросов и длительности сеанс не должен запускаться.'
+    )
+
+
+def test_profiler_superuser_only(user_client):
+    assert user_client.get('/profiler/').status_code == 401, (
+        'Профилировщик должен быть доступен только суперпользователю.'
+    )
@@ -0,0 +1,55 @@
+import asyncio
+
+from conftest import TestingSessionLocal
+
+from app.models import CharityProject, Donation
+from app.services.replay import replay
+
+
+async def verify():
+    async with TestingSessionLocal() as session:
+        return await replay(session, verify=True)
+
+
+def test_replay_matches_online_allocation(user_client, charity_project, charity_project_nunchaku):
+    for amount in (600000, 600000, 100):
+        user_client.post('/donation/', json={'full_amount': amount})
+    assert asyncio.run(verify()) == {'charityproject': [], 'donation': []}, (
+        'Пересчёт с нуля должен совпадать с распределением при создании объектов.'
+    )
+
+
+async def test_replay_verify_reports_and_fixes(mixer):
+    project = mixer.blend(
+        CharityProject, name='Broken', description='Broken', full_amount=100,
+        invested_amount=0, fully_invested=False, close_date=None,
+    )
+    donation = mixer.blend(
+        Donation, full_amount=150, invested_amount=0, fully_invested=False,
+        close_date=None, user_id=None,
+    )
+    async with TestingSessionLocal() as session:
+        report = await replay(session, verify=True)
+    assert report == {
+        'charityproject': [dict(id=project.id, invested_amount=0, expected_invested_amount=100)],
+        'donation': [dict(id=donation.id, invested_amount=0, expected_invested_amount=100)],
+    }, 'Режим проверки должен показывать расхождения с пересчётом.'
+
+    async with TestingSessionLocal() as session:
+        await replay(session, chunk_size=1)
+    async with TestingSessionLocal() as session:
+        fixed_project = await session.get(CharityProject, project.id)
+        fixed_donation = await session.get(Donation, donation.id)
+        report = await replay(session, verify=True)
+    assert fixed_project.invested_amount == 100 and fixed_project.fully_invested, (
+        'Пересчёт должен закрывать собранный проект.'
+    )
+    assert fixed_project.close_date is not None, (
+        'У закрытого при пересчёте проекта должна появиться дата закрытия.'
+    )
+    assert fixed_donation.invested_amount == 100 and not fixed_donation.fully_invested, (
+        'Остаток пожертвования должен оставаться свободным.'
+    )
+    assert report == {'charityproject': [], 'donation': []}, (
+        'После пересчёта расхождений быть не должно.'
+    )
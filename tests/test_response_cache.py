@@ -0,0 +1,84 @@
+from app.core.cache import response_cache
+from app.core.metrics import fragment_cache_rows
+
+
+def test_repeat_with_etag_not_modified(user_client, charity_project):
+    first = user_client.get('/charity_project/')
+    etag = first.headers.get('ETag')
+    assert etag, 'Список проектов должен отдаваться с ETag.'
+    second = user_client.get(
+        '/charity_project/', headers={'If-None-Match': etag}
+    )
+    assert second.status_code == 304, (
+        'Повтор с тем же ETag должен получать 304.'
+    )
+    assert second.content == b'', 'Ответ 304 должен быть без тела.'
+    assert second.headers['X-SQL-Statements'] == '0', (
+        'Ответ из кэша не должен обращаться к БД.'
+    )
+
+
+def test_cached_body_without_etag(user_client, charity_project):
+    first = user_client.get('/charity_project/')
+    second = user_client.get('/charity_project/')
+    assert second.status_code == 200
+    assert second.content == first.content, (
+        'Без If-None-Match из кэша должно отдаваться то же тело.'
+    )
+    assert second.headers['X-SQL-Statements'] == '0', (
+        'Повторный запрос должен обслуживаться из кэша.'
+    )
+
+
+def test_cache_invalidated_by_donation(user_client, charity_project):
+    etag = user_client.get('/charity_project/').headers['ETag']
+    user_client.post('/donation/', json={'full_amount': 10})
+    response = user_client.get(
+        '/charity_project/', headers={'If-None-Match': etag}
+    )
+    assert response.status_code == 200, (
+        'После пожертвования кэш списка проектов должен сбрасываться.'
+    )
+    assert response.json()[0]['invested_amount'] == 10, (
+        'После сброса кэша список должен показывать новые суммы.'
+    )
+    assert response.headers['ETag'] != etag, (
+        'Новое тело должно получить новый ETag.'
+    )
+
+
+def test_cache_keeps_next_page_headers(user_client, charity_project,
+                                       charity_project_nunchaku):
+    first = user_client.get('/charity_project/?limit=1')
+    second = user_client.get('/charity_project/?limit=1')
+    assert second.headers['X-SQL-Statements'] == '0'
+    assert second.headers.get('Link') == first.headers.get('Link'), (
+        'Ответ из кэша должен сохранять ссылку на следующую страницу.'
+    )
+    assert len(user_client.get('/charity_project/').json()) == 2, (
+        'Разные параметры запроса должны кэшироваться отдельно.'
+    )
+
+
+def test_cache_off_same_body(
+        user_client, charity_project, small_fully_charity_project,
+        monkeypatch
+):
+    monkeypatch.setattr(response_cache, 'max_size', 0)
+    regular = user_client.get('/charity_project/')
+    assert 'ETag' not in regular.headers, (
+        'Без кэша ETag не выставляется.'
+    )
+    monkeypatch.undo()
+    assert user_client.get('/charity_project/').content == regular.content, (
+        'Кэшируемое тело должно совпадать с ответом без кэша, байт в байт.'
+    )
+
+
+def test_cache_keeps_response_model_path(user_client, charity_project):
+    encoded = sum(fragment_cache_rows.values.values())
+    user_client.get('/charity_project/')
+    assert sum(fragment_cache_rows.values.values()) == encoded, (
+        'Кэш ответов не должен переводить список на orjson, пока '
+        'FAST_LIST_RESPONSES выключен.'
+    )
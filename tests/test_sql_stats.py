@@ -0,0 +1,68 @@
+import json
+import logging
+
+import pytest
+from conftest import engine
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.core.db import redact
+
+
+def test_sql_stats_headers(user_client, donation):
+    response = user_client.get('/donation/my')
+    assert response.headers['X-SQL-Statements'] == '1', (
+        'Заголовок X-SQL-Statements должен содержать число SQL-запросов '
+        'обработчика.'
+    )
+    assert float(response.headers['X-SQL-Time-Ms']) >= 0, (
+        'Заголовок X-SQL-Time-Ms должен содержать время в БД.'
+    )
+
+
+def test_sql_stats_count_allocation_writer(user_client, charity_project):
+    response = user_client.post('/donation/', json={'full_amount': 10})
+    assert int(response.headers['X-SQL-Statements']) >= 5, (
+        'Запросы распределения в фоновой задаче должны засчитываться '
+        'обработчику, который его запросил.'
+    )
+
+
+def test_slow_query_log(user_client, donation, monkeypatch, caplog):
+    monkeypatch.setattr(settings, 'sql_slow_query_ms', 0)
+    caplog.set_level(logging.INFO, logger='app.sql.slow')
+    user_client.get('/donation/my')
+    records = [
+        json.loads(record.getMessage()) for record in caplog.records
+        if record.name == 'app.sql.slow'
+    ]
+    assert records, 'Запросы дольше порога должны попадать в журнал.'
+    assert records[0]['endpoint'] == 'GET /donation/my', (
+        'В журнале медленных запросов должен быть указан эндпоинт.'
+    )
+    assert set(records[0]['parameters']) == {'int'}, (
+        'Значения параметров в журнале должны быть скрыты.'
+    )
+
+
+def test_redact_hides_values():
+    assert redact({'name': 'secret', 'id': 1}) == {
+        'name': 'str', 'id': 'int'
+    }, 'Значения именованных параметров должны заменяться типами.'
+    assert redact([(1, 'a'), (2, 'b')]) == {
+        'rows': 2, 'first': ['int', 'str']
+    }, 'Для executemany достаточно числа строк и формы первой строки.'
+
+
+async def test_failed_statement_leaves_no_timer():
+    async with engine.connect() as conn:
+        with pytest.raises(IntegrityError):
+            await conn.execute(text(
+                'INSERT INTO donation (full_amount) VALUES (NULL)'
+            ))
+        info = conn.sync_connection.info
+        assert info['query_started'] == [] and info['query_spans'] == [], (
+            'Упавший запрос не должен оставлять таймер и интервал '
+            'в соединении пула.'
+        )
@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy import update
+
+from benchmarks.stress import check_invariants, run
+from conftest import TestingSessionLocal
+from app.core.config import settings
+from app.models import CharityProject
+
+
+@pytest.mark.parametrize('backend', ['orm', 'memory', 'window'])
+async def test_stress_run_keeps_invariants(backend, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, 'allocation_backend', backend)
+    report = await run(
+        donations=120, projects=8, concurrency=20, workdir=tmp_path
+    )
+    assert report['violations'] == [], (
+        'После конкурентных запросов суммы проектов и пожертвований '
+        'должны сходиться.'
+    )
+    assert report['statuses'].get('200') == report['requests'], (
+        'Все запросы нагрузочного прогона должны завершаться успешно.'
+    )
+
+
+async def test_check_invariants_reports_broken_sums(charity_project):
+    async with TestingSessionLocal() as session:
+        assert await check_invariants(session) == [], (
+            'Согласованные данные не должны давать нарушений.'
+        )
+        await session.execute(
+            update(CharityProject).values(
+                invested_amount=CharityProject.full_amount + 1
+            )
+        )
+        await session.commit()
+        violations = await check_invariants(session)
+    assert any('больше полной суммы' in line for line in violations), (
+        'Проверка должна находить строки, вложенные сверх полной суммы.'
+    )
+    assert any('не равна' in line for line in violations), (
+        'Проверка должна находить расхождение общих сумм.'
+    )
@@ -0,0 +1,64 @@
+import json
+import logging
+
+from app.core.config import settings
+
+
+def exported_spans(caplog) -> list[dict]:
+    return [
+        span
+        for record in caplog.records if record.name == 'app.trace'
+        for span in json.loads(
+            record.getMessage()
+        )['resourceSpans'][0]['scopeSpans'][0]['spans']
+    ]
+
+
+def test_trace_spans_nested_by_layer(
+        superuser_client, charity_project, monkeypatch, caplog
+):
+    monkeypatch.setattr(settings, 'trace_sample_rate', 1.0)
+    caplog.set_level(logging.INFO, logger='app.trace')
+    superuser_client.patch(
+        f'/charity_project/{charity_project.id}', json={'full_amount': 10 ** 7}
+    )
+    spans = {span['name']: span for span in exported_spans(caplog)}
+    root = spans['PATCH /charity_project/{project_id}']
+    assert root['parentSpanId'] == '', 'Корнем трассы должен быть запрос.'
+    for name in (
+        'CharityProjectValidator.get_if_exists',
+        'CharityProjectValidator.is_full_amount',
+        'CRUDCharityProject.update',
+        'session.commit',
+        'session.refresh',
+        'sql',
+    ):
+        assert name in spans, f'В трассе должен быть интервал `{name}`.'
+    assert (
+        spans['jsonable_encoder']['parentSpanId'] ==
+        spans['CRUDCharityProject.update']['spanId']
+    ), 'Интервалы должны вкладываться по слоям вызовов.'
+    assert len({span['traceId'] for span in spans.values()}) == 1, (
+        'Все интервалы запроса должны относиться к одной трассе.'
+    )
+
+
+def test_trace_includes_allocation_writer(
+        user_client, charity_project, monkeypatch, caplog
+):
+    monkeypatch.setattr(settings, 'trace_sample_rate', 1.0)
+    caplog.set_level(logging.INFO, logger='app.trace')
+    user_client.post('/donation/', json={'full_amount': 10})
+    names = {span['name'] for span in exported_spans(caplog)}
+    assert {'donate', 'allocate', 'invest_streamed'} <= names, (
+        'Распределение в фоновой задаче должно попадать в трассу запроса.'
+    )
+
+
+def test_trace_not_sampled(user_client, monkeypatch, caplog):
+    monkeypatch.setattr(settings, 'trace_sample_rate', 0.0)
+    caplog.set_level(logging.INFO, logger='app.trace')
+    user_client.get('/donation/my')
+    assert exported_spans(caplog) == [], (
+        'Запросы вне выборки не должны выгружать трассы.'
+    )
@@ -0,0 +1,113 @@
+import pytest
+from conftest import TEST_DB, app, get_async_session, override_db
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.core.metrics import user_cache_requests
+from app.core.user import user_cache
+
+
+@pytest.fixture
+def auth_client():
+    app.dependency_overrides = {}
+    app.dependency_overrides[get_async_session] = override_db
+    user_cache.clear()
+    with TestClient(app) as client:
+        yield client
+
+
+def login(client, email: str, superuser: bool = False) -> dict:
+    user_id = client.post(
+        '/auth/register', json={'email': email, 'password': 'qwerty'}
+    ).json()['id']
+    if superuser:
+        with create_engine(f'sqlite:///{TEST_DB}').begin() as connection:
+            connection.execute(
+                text('UPDATE user SET is_superuser = 1 WHERE id = :id'),
+                {'id': user_id},
+            )
+    token = client.post(
+        '/auth/jwt/login', data={'username': email, 'password': 'qwerty'}
+    ).json()['access_token']
+    return {'Authorization': f'Bearer {token}'}
+
+
+def test_user_lookup_cached(auth_client):
+    headers = login(auth_client, 'cat@example.com')
+    misses = user_cache_requests.values.get(('miss',), 0)
+    first = auth_client.get('/donation/my', headers=headers)
+    second = auth_client.get('/donation/my', headers=headers)
+    assert second.status_code == 200
+    assert (
+        int(second.headers['X-SQL-Statements']) ==
+        int(first.headers['X-SQL-Statements']) - 1
+    ), 'Повторная проверка токена не должна обращаться к БД.'
+    assert user_cache_requests.values[('miss',)] == misses + 1, (
+        'Пользователь должен читаться из БД один раз, промахи кэша '
+        'учитываются в метриках.'
+    )
+
+
+def test_user_update_through_cache(auth_client):
+    headers = login(auth_client, 'cat@example.com')
+    auth_client.get('/donation/my', headers=headers)
+    response = auth_client.patch(
+        '/users/me', json={'email': 'kitten@example.com'}, headers=headers
+    )
+    assert response.status_code == 200, (
+        'Пользователь из кэша должен изменяться как обычный.'
+    )
+    assert auth_client.get(
+        '/users/me', headers=headers
+    ).json()['email'] == 'kitten@example.com', (
+        'После изменения пользователя кэш должен сбрасываться.'
+    )
+
+
+def test_deactivated_user_rejected(auth_client):
+    headers = login(auth_client, 'cat@example.com')
+    admin = login(auth_client, 'admin@example.com', superuser=True)
+    user_id = auth_client.get('/users/me', headers=headers).json()['id']
+    response = auth_client.patch(
+        f'/users/{user_id}', json={'is_active': False}, headers=admin
+    )
+    assert response.status_code == 200
+    assert auth_client.get(
+        '/donation/my', headers=headers
+    ).status_code == 401, (
+        'Отключённый пользователь не должен проходить проверку токена '
+        'из кэша.'
+    )
+
+
+def test_ttl_cache_expires_and_skips_stale_put(monkeypatch):
+    monkeypatch.setattr(user_cache, 'ttl', 0)
+    user_cache.clear()
+    user_cache.put(1, {'id': 1}, user_cache.generation)
+    assert user_cache.get(1) is None, (
+        'Запись кэша пользователей должна устаревать по сроку жизни.'
+    )
+    generation = user_cache.generation
+    user_cache.discard(1)
+    user_cache.put(1, {'id': 1}, generation)
+    assert 1 not in user_cache.entries, (
+        'Значение, прочитанное до сброса, не должно попадать в кэш.'
+    )
+
+
+def test_list_checks_token_only_for_all(auth_client):
+    headers = login(auth_client, 'cat@example.com')
+    admin = login(auth_client, 'admin@example.com', superuser=True)
+    lookups = sum(user_cache_requests.values.values())
+    auth_client.get('/charity_project/', headers=headers)
+    assert sum(user_cache_requests.values.values()) == lookups, (
+        'Список без all=true не должен загружать пользователя по токену.'
+    )
+    assert auth_client.get(
+        '/charity_project/?all=true', headers=headers
+    ).status_code == 403
+    assert auth_client.get(
+        '/charity_project/?all=true', headers=admin
+    ).status_code == 200, (
+        'Суперпользователь с токеном должен получать список без страниц.'
+    )